@@ -0,0 +1,54 @@
+# benchmarks/bench_render.py
+# Element count and render wall time of render_combined_markdown on long LLM-style answers,
+# with one st.markdown per line (before) vs. one per paragraph group (after).
+#
+#   python -m benchmarks.bench_render
+import time
+from streamlit.testing.v1 import AppTest
+from utils.print_pro import parse_markdown_blocks
+
+
+def make_answer(sections: int) -> str:
+    parts = []
+    for n in range(1, sections + 1):
+        parts.append(f"## {n}. Section title")
+        parts.append("")
+        parts.append(f"This paragraph explains point {n} in some detail, as a consultant answer would.")
+        parts.append("It continues on a second line with inline math $a_{n} = a_{n-1} + d$ for good measure.")
+        parts.append("")
+        parts.append("Key points:")
+        for k in range(1, 6):
+            parts.append(f"- **Point {k}**: a short bullet with `inline_code_{k}` and a few more words.")
+        parts.append("")
+        parts.append("```python")
+        parts.append(f"def step_{n}(x):")
+        parts.append("    return x * 2")
+        parts.append("```")
+        parts.append("")
+    return "\n".join(parts)
+
+
+def _render_app(text, coalesce):
+    from utils.print_pro import parse_markdown_blocks, render_blocks
+    render_blocks(parse_markdown_blocks(text, coalesce=coalesce))
+
+
+def time_render(text: str, coalesce: bool, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        at = AppTest.from_function(_render_app, args=(text, coalesce), default_timeout=60)
+        start = time.perf_counter()
+        at.run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    print(f"{'lines':>6} {'elements before':>16} {'elements after':>15} {'render before':>14} {'render after':>13}")
+    for sections in (10, 40, 160):
+        text = make_answer(sections)
+        before = len(parse_markdown_blocks(text, coalesce=False))
+        after = len(parse_markdown_blocks(text, coalesce=True))
+        t_before = time_render(text, coalesce=False)
+        t_after = time_render(text, coalesce=True)
+        print(f"{text.count(chr(10)) + 1:>6} {before:>16} {after:>15} {t_before * 1000:>12.1f}ms {t_after * 1000:>11.1f}ms")
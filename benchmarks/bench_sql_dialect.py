@@ -0,0 +1,63 @@
+# benchmarks/bench_sql_dialect.py
+# detect_sql_dialect on multi-KB SQL answers: per-keyword re.search loop (before)
+# vs. precompiled per-dialect alternations (after).
+#
+#   python -m benchmarks.bench_sql_dialect
+import re
+import time
+from utils.print_pro import (
+    detect_sql_dialect, ORACLE_SQL_KEYWORDS, MYSQL_SQL_KEYWORDS, POSTGRES_SQL_KEYWORDS
+)
+
+
+def legacy_detect_sql_dialect(text: str) -> str | None:
+    if re.search(r"\bSELECT\b", text, re.IGNORECASE):
+        for kw in ORACLE_SQL_KEYWORDS:
+            if re.search(rf"\b{kw}\b", text, re.IGNORECASE):
+                return "oracle-sql"
+        for kw in MYSQL_SQL_KEYWORDS:
+            if re.search(rf"\b{kw}\b", text, re.IGNORECASE):
+                return "mysql"
+        for kw in POSTGRES_SQL_KEYWORDS:
+            if re.search(rf"{kw}", text, re.IGNORECASE):
+                return "postgresql"
+        return "sql"
+    return None
+
+
+def make_sql(statements: int, extra: str = "") -> str:
+    lines = []
+    for i in range(statements):
+        lines.append(
+            f"SELECT c.customer_id, SUM(o.total_amount) AS total_{i}\n"
+            f"  FROM customers c JOIN orders o ON o.customer_id = c.customer_id\n"
+            f" WHERE o.created_at >= '2024-01-01'\n"
+            f" GROUP BY c.customer_id HAVING SUM(o.total_amount) > {i};"
+        )
+    if extra:
+        lines.insert(len(lines) // 2, extra)
+    return "\n".join(lines)
+
+
+def per_call_us(func, text, repeat=200) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(text)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+if __name__ == "__main__":
+    cases = {
+        "generic 4KB": make_sql(20),
+        "generic 40KB": make_sql(200),
+        "mysql 40KB": make_sql(200, "ORDER BY total DESC LIMIT 10;"),
+        "postgres 40KB": make_sql(200, "RETURNING id;"),
+        "oracle 40KB": make_sql(200, "SELECT SYSDATE FROM dual;"),
+    }
+    print(f"{'case':<14} {'dialect':<11} {'before':>10} {'after':>10}")
+    for name, text in cases.items():
+        dialect = detect_sql_dialect(text)
+        assert dialect == legacy_detect_sql_dialect(text)
+        before = per_call_us(legacy_detect_sql_dialect, text)
+        after = per_call_us(detect_sql_dialect, text)
+        print(f"{name:<14} {dialect:<11} {before:>8.0f}us {after:>8.0f}us")
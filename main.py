@@ -1,11 +1,10 @@
 # login.py
-from PIL import Image
-from utils.graphic_pro import get_base64_image
+from utils.graphic_pro import get_base64_image, load_image
 import streamlit as st
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 import re
 import stripe
+from utils.auth_pro import UserStore, GoogleSheetUserStore, SQLiteUserStore
+from utils.client_pro import get_gsheet_client
 
 # USERS = st.secrets["users"]
 
@@ -18,7 +17,7 @@ st.set_page_config(
 
 )
 
-sidebar_logo = Image.open("photo/ai_logo_4.png")
+sidebar_logo = load_image("photo/ai_logo_4.png", width=300)
 st.sidebar.image(sidebar_logo, use_container_width=True)
 
 stripe.api_key = st.secrets["stripe_secret"]
@@ -63,35 +62,30 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# --- Google Sheets Credentials ---
-scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+# --- User store ---
+# Accounts live in the Google Sheet by default; set `user_store = "sqlite"` in secrets
+# to serve logins from a local database instead (offline runs, load tests).
+SHEET_URL = "https://docs.google.com/spreadsheets/d/1nrfVkmUvZbjcZKPGrxvzsubjyHeBEfB0aEiHjknZQMc/edit?gid=0#gid=0"
 
-# Load credentials from Streamlit secrets
-credentials_dict = st.secrets["gcp_service_account"]
-creds = ServiceAccountCredentials.from_json_keyfile_dict(credentials_dict, scope)
-client = gspread.authorize(creds)
 
-# Google Sheet URL and worksheet
-sheet_url = "https://docs.google.com/spreadsheets/d/1nrfVkmUvZbjcZKPGrxvzsubjyHeBEfB0aEiHjknZQMc/edit?gid=0#gid=0"
-sheet = client.open_by_url(sheet_url).sheet1  # use first sheet
+@st.cache_resource
+def get_user_store() -> UserStore:
+    if st.secrets.get("user_store", "gsheet") == "sqlite":
+        return SQLiteUserStore(st.secrets.get("user_db_path", "data/users.sqlite3"))
 
-
-def get_users_from_sheet():
-    """Fetch usernames and passwords from Google Sheets"""
-    records = sheet.get_all_records()
-    users = {record["username"]: record["password"] for record in records}
-    return users
+    # Google Sheets client is only created for this backend
+    sheet = get_gsheet_client().open_by_url(SHEET_URL).sheet1  # use first sheet
+    return GoogleSheetUserStore(sheet)
 
 
 def register_user(username, password):
-    """Write a new user to the Google Sheet"""
-    sheet.append_row([username, password])
-    # sheet.append_row([username.strip(), password.strip()])
+    """Save a new user in the configured user store"""
+    get_user_store().add(username, password)
+    # get_user_store().add(username.strip(), password.strip())
 
 
 def user_exists(email):
-    users = get_users_from_sheet()
-    return email in users
+    return get_user_store().exists(email)
 
 
 def login_screen():
@@ -129,8 +123,7 @@ def login_screen():
                     login_button = st.form_submit_button("Login")
 
                     if login_button:
-                        USERS = get_users_from_sheet()
-                        if username.strip() in USERS and USERS[username.strip()] == password.strip():
+                        if get_user_store().verify(username.strip(), password.strip()):
                             st.session_state["authenticated"] = True
                             st.session_state["username"] = username.strip()
                             st.success("Login successful. Redirecting...")
@@ -168,7 +161,7 @@ def login_screen():
             #                     st.error(f"Error creating payment session: {e}")
 
         with col1:
-            ai_logo = get_base64_image("photo/ai_logo_4.png")
+            ai_logo = get_base64_image("photo/ai_logo_4.png", width=900)
             st.markdown(f"""
                     <div style='display: flex; align-items: center; gap: 16px; margin-bottom: 1px;'>
                         <img src='{ai_logo}' width='900'>
@@ -404,19 +404,45 @@
 
 
 import streamlit as st
-from openai import OpenAI
-from PIL import Image
-from utils.graphic_pro import get_base64_image
-from utils.print_pro import render_combined_markdown
-from utils.pdf_pro import read_pdf, chunk_text, vectorize_text_chunks, find_most_similar_chunks
-from google import genai
+from utils.graphic_pro import get_base64_image, load_image, optimized_image_path, AVATAR_WIDTH
+from utils.provider_pro import get_provider, stream_concurrently
+from utils.llm_pro import call_llm, stream_llm, hedged_stream, metrics as llm_metrics
+from utils.print_pro import render_cached_markdown, render_markdown_stream, StreamingMarkdownRenderer
+from utils.pdf_pro import load_pdf_index, find_most_similar_chunks
+from utils.cache_pro import DiskCache, cache_path
+from utils.memory_pro import ConversationMemory
+from utils.token_pro import (
+    MODEL_PRICES, usage_cost, count_tokens, count_message_tokens, context_limit, trim_context_to_budget,
+)
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import time
+
+# API clients are shared per process and created on first use (see utils/client_pro.py)
+
+# Cheap model that folds old conversation turns into the memory summary
+MEMORY_SUMMARY_PROVIDER = "GPT-5-mini"
+
+
+@st.cache_resource
+def get_background_executor():
+    # Shared by all sessions for work that must not hold up a reply (memory summaries)
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="aipa-background")
+
 
-# Initialize OpenAI client with API key from Streamlit secrets
-client_openai = OpenAI(api_key=st.secrets["ai_key"])
-OpenAI.api_key = st.secrets["ai_key"]
-gemini_client = genai.Client(api_key=st.secrets["GEMINI_API_KEY"])
+@st.cache_resource
+def get_response_cache():
+    # Exact-match answers shared by all sessions; least recently used ones go first past the size cap
+    max_mb = st.secrets.get("response_cache_mb", 200)
+    return DiskCache(cache_path("aipa_responses"), max_bytes=int(max_mb * 1024 * 1024))
 
-client_deepseek = OpenAI(api_key=st.secrets["deepseek_key"], base_url="https://api.deepseek.com")
+
+@st.cache_resource
+def get_pdf_index_cache():
+    # Chunks and TF-IDF index of every uploaded PDF, keyed by content hash and shared by all sessions
+    max_mb = st.secrets.get("pdf_index_cache_mb", 500)
+    return DiskCache(cache_path("pdf_index"), max_bytes=int(max_mb * 1024 * 1024))
 
 # Authentication check
 if "authenticated" not in st.session_state or not st.session_state["authenticated"]:
@@ -438,9 +464,16 @@ if st.sidebar.button("Logout"):
     st.switch_page("main.py")
 
 st.sidebar.markdown("---")
-sidebar_logo = Image.open("photo/ai_logo_4.png")
+sidebar_logo = load_image("photo/ai_logo_4.png", width=300)
 st.sidebar.image(sidebar_logo, use_container_width=True)
 
+with st.sidebar.expander("📈 Provider health"):
+    llm_stats = llm_metrics.snapshot()
+    if llm_stats:
+        st.dataframe(llm_stats, hide_index=True)
+    else:
+        st.caption("No requests yet.")
+
 # ---------------------- Initialize States ----------------------
 if "messages_text" not in st.session_state:
     st.session_state.messages_text = []
@@ -456,7 +489,8 @@ if "last_processed_input_pdf" not in st.session_state:
 if "memory_enabled" not in st.session_state:
     st.session_state.memory_enabled = False
 if "chat_memory" not in st.session_state:
-    st.session_state.chat_memory = []
+    # Recent turns verbatim within this many tokens; older ones are summarized in the background
+    st.session_state.chat_memory = ConversationMemory(budget=int(st.secrets.get("memory_token_budget", 4000)))
 
 
 # ---------------------- System Prompt ----------------------
@@ -479,6 +513,11 @@ def get_system_prompt():
 
 # 1. Define the mapping function
 def get_avatar(role):
+    # Small WebP variant from the asset manifest when available, otherwise the original file
+    return optimized_image_path(_avatar_source(role), AVATAR_WIDTH)
+
+
+def _avatar_source(role):
     if role == "user":
         return "./photo/user.png"
 
@@ -495,78 +534,148 @@ def get_avatar(role):
     return "./photo/ai_logo_avatat.png"  # Default avatar
 
 
-def chat_gpt(user_prompt, system_prompt=""):
-    try:
-        messages = []
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        if st.session_state.memory_enabled and st.session_state.chat_memory:
-            messages.extend(st.session_state.chat_memory[-20:])
-        messages.append({"role": "user", "content": user_prompt})
-
-        provider = st.session_state["provider"]
-
-        if provider == "GPT-5-mini":
-            response = client_openai.chat.completions.create(
-                model="gpt-5-mini",
-                messages=messages
-            )
-            return response.choices[0].message.content.strip()
+def build_messages(user_prompt, system_prompt="", backend=None, context=""):
+    """Messages laid out for provider-side prompt caching.
 
-        elif provider == "deepseek-chat":
-            response = client_deepseek.chat.completions.create(
-                model="deepseek-chat",
-                messages=messages,
-                stream=False
-            )
-            return response.choices[0].message.content.strip()
+    Providers reuse the longest unchanged prefix of a request, so the parts that stay the
+    same from turn to turn come first: the system prompt, then the pasted context or PDF
+    excerpts, then the memory summary (all in the one system message, as Gemini takes a
+    single system instruction and DeepSeek rejects consecutive user messages), then the
+    recent turns and finally the new question.
+    """
+    memory = st.session_state.chat_memory if st.session_state.memory_enabled else None
+    # Read first: it also picks up a summary finished in the background
+    recent = memory.recent_messages(backend) if memory else []
 
-        elif provider == "deepseek-reasoner":
-            response = client_deepseek.chat.completions.create(
-                model="deepseek-reasoner",
-                messages=messages,
-                stream=False
-            )
-            return response.choices[0].message.content.strip()
+    sections = [system_prompt] if system_prompt else []
+    if context:
+        delimiter = "'''"
+        sections.append(f"Additional materials for this conversation are delimited by {delimiter}.\n\n{delimiter}\n{context}\n{delimiter}")
+    if memory and memory.summary:
+        sections.append(f"Summary of the earlier conversation:\n{memory.summary}")
+
+    messages = []
+    if sections:
+        messages.append({"role": "system", "content": "\n\n".join(sections)})
+    messages.extend(recent)
+    messages.append({"role": "user", "content": user_prompt})
+    return messages
+
+
+def summarize_memory(prompt):
+    # Runs on the background executor: no st.* calls here
+    summarizer = get_provider(MEMORY_SUMMARY_PROVIDER)
+    return call_llm(summarizer.backend, summarizer.complete, [{"role": "user", "content": prompt}])
+
+
+def remember_turn(user_content, assistant_content):
+    memory = st.session_state.chat_memory
+    memory.add_turn(user_content, assistant_content)
+    memory.maybe_summarize(get_provider(st.session_state["provider"]).backend,
+                           get_background_executor().submit, summarize_memory)
+
+
+def hedge_backup(provider):
+    """Backup provider to hedge with, or None when hedging is off or would hit the same model."""
+    backup = st.session_state.get("hedge_provider")
+    if st.session_state.get("hedge_enabled") and backup and backup != provider:
+        return get_provider(backup)
+    return None
+
+
+def response_cache_key(provider, messages):
+    payload = json.dumps({"provider": provider.name, "model": provider.model, "messages": messages},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cached_response(provider, messages):
+    """Stored answer for exactly these messages, when the response cache is on."""
+    if not st.session_state.get("cache_enabled"):
+        return None
+    return get_response_cache().get(response_cache_key(provider, messages))
+
+
+def store_response(provider, messages, text):
+    # Only the selected provider's own, complete answers are stored (not hedged or failed ones)
+    if st.session_state.get("cache_enabled") and text and not hedge_backup(provider.name):
+        get_response_cache().set(response_cache_key(provider, messages), text)
+
+
+def hedged_answer(provider, backup, messages, usage=None, hedge=None):
+    """Stream the answer of whichever of `provider` and `backup` starts answering first.
+
+    The deadline runs to the first sign of life, not the whole answer, so a slow reasoning
+    model that is thinking isn't hedged away. Each leg fills its own usage dict, so the loser
+    can't overwrite the winner's numbers. `hedge` (a dict) gets "provider", the one that
+    answered, and when both legs were called "loser" and "loser_input_tokens": the loser's
+    prompt is billed too. Its output before cancellation is never reported, so it isn't counted.
+    """
+    adapters = {"primary": provider, "backup": backup}
+    leg_usage = {"primary": {}, "backup": {}}
+    outcome = {}
+    yield from hedged_stream(
+        lambda cancel: stream_llm(provider.backend, provider.stream, messages,
+                                  usage=leg_usage["primary"], cancel=cancel),
+        lambda cancel: stream_llm(backup.backend, backup.stream, messages,
+                                  usage=leg_usage["backup"], cancel=cancel),
+        deadline=st.session_state.hedge_deadline,
+        metrics_key=provider.backend,
+        outcome=outcome,
+    )
+    winner = outcome["winner"]
+    if usage is not None:
+        usage.update(leg_usage[winner])
+    if hedge is not None:
+        hedge["provider"] = adapters[winner].name
+        if len(outcome["started"]) == 2:
+            loser = "backup" if winner == "primary" else "primary"
+            hedge["loser"] = adapters[loser].name
+            hedge["loser_input_tokens"] = (leg_usage[loser].get("input_tokens")
+                                           or count_message_tokens(messages, adapters[loser].backend))
+
+
+def chat_gpt(user_prompt, system_prompt="", context="", usage=None, hedge=None):
+    """Answer text; with hedging on, `hedge` (a dict) is filled as described in hedged_answer."""
+    try:
+        provider = get_provider(st.session_state["provider"])
+        messages = build_messages(user_prompt, system_prompt, provider.backend, context)
+        cached = cached_response(provider, messages)
+        if cached is not None:
+            return cached
+        backup = hedge_backup(provider.name)
+        if backup:
+            # Streamed under the hood and joined, so the hedge deadline is a first-token deadline
+            return "".join(hedged_answer(provider, backup, messages, usage, hedge)).strip()
+        bot_response = call_llm(provider.backend, provider.complete, messages, usage=usage)
+        store_response(provider, messages, bot_response)
+        return bot_response
 
-        elif provider == "GPT-5.2-chat":
-            response = client_openai.chat.completions.create(
-                model="gpt-5.2-chat-latest",
-                messages=messages
-            )
-            return response.choices[0].message.content.strip()
+    except Exception as e:
+        return f"Error: {str(e)}"
 
-        elif provider == "GPT-5.2":
-            response = client_openai.responses.create(
-                model="gpt-5.2",
-                input=messages
-            )
-            return response.output_text.strip()
-
-        elif provider == "Gemini-3":
-            gemini_system_instruction = ""
-            gemini_contents = []
-            for message in messages:
-                if message["role"] == "system":
-                    gemini_system_instruction = message["content"]
-                elif message["role"] == "user":
-                    gemini_contents.append({"role": "user", "parts": [{"text": message["content"]}]})
-                elif message["role"] == "assistant":
-                    gemini_contents.append({"role": "model", "parts": [{"text": message["content"]}]})
-
-            config = {}
-            if gemini_system_instruction:
-                config["system_instruction"] = gemini_system_instruction
-
-            response = gemini_client.models.generate_content(
-                model="gemini-3-pro-preview",
-                contents=gemini_contents,
-                config=config
-            )
-            return response.text
+
+def stream_chat_gpt(user_prompt, system_prompt="", context="", usage=None, hedge=None):
+    """Same as chat_gpt, but yields the answer piece by piece as the provider produces it."""
+    try:
+        provider = get_provider(st.session_state["provider"])
+        messages = build_messages(user_prompt, system_prompt, provider.backend, context)
+        cached = cached_response(provider, messages)
+        if cached is not None:
+            yield cached
+            return
+        backup = hedge_backup(provider.name)
+        if backup:
+            yield from hedged_answer(provider, backup, messages, usage, hedge)
+            return
+        parts = []
+        for piece in stream_llm(provider.backend, provider.stream, messages, usage=usage):
+            parts.append(piece)
+            yield piece
+        store_response(provider, messages, "".join(parts).strip())
 
     except Exception as e:
-        return f"Error: {str(e)}"
+        yield f"Error: {str(e)}"
 
     # st.markdown("""
     # <style>
@@ -654,8 +763,132 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+# ---------------------- Compare Mode ----------------------
+def model_prices():
+    return {**MODEL_PRICES, **{model: tuple(price) for model, price in st.secrets.get("pricing", {}).items()}}
+
+
+def turn_caption(result):
+    """One-line latency, token and cost breakdown of an answer."""
+    parts = [f"⏱ {result['latency']:.1f} s"]
+    if result.get("hedged_to"):
+        parts.append(f"answered by {result['hedged_to']}")
+    if result.get("first_token") is not None:
+        parts.append(f"first token {result['first_token']:.1f} s")
+    usage = result.get("usage") or {}
+    if usage:
+        cached = f" ({usage['cached_tokens']:,} cached)" if usage.get("cached_tokens") else ""
+        parts.append(f"{usage['input_tokens']:,} in{cached} / {usage['output_tokens']:,} out tokens")
+    if result.get("cost") is not None:
+        parts.append(f"${result['cost']:.4f}")
+    if result.get("hedge_loser"):
+        spend = f" ≈ ${result['hedge_loser_cost']:.4f}" if result.get("hedge_loser_cost") is not None else ""
+        parts.append(f"+ {result['hedge_loser']} hedge leg{spend} (prompt only, its cut-off output isn't reported)")
+    return " · ".join(parts)
+
+
+def render_message_content(msg):
+    if not msg.get("compare"):
+        render_cached_markdown(msg['content'])
+        if msg.get("stats"):
+            st.caption(turn_caption(msg["stats"]))
+        return
+    for column, result in zip(st.columns(len(msg["compare"])), msg["compare"]):
+        with column:
+            st.markdown(f"**{result['provider']}**")
+            render_cached_markdown(result["content"])
+            st.caption(turn_caption(result))
+
+
+def get_compare_responses(user_prompt, system_prompt, user_avatar, bot_avatar, context=""):
+    """Stream the prompt from every compared provider at once, one column each."""
+    messages = build_messages(user_prompt, system_prompt, context=context)
+    adapters = [get_provider(name) for name in st.session_state.compare_providers]
+    results = [{"provider": adapter.name, "content": ""} for adapter in adapters]
+
+    with stream_slot.container():
+        with st.chat_message(name="User", avatar=user_avatar):
+            st.markdown(user_input)
+        with st.chat_message(name="Milliona", avatar=bot_avatar):
+            renderers, captions = [], []
+            for column, adapter in zip(st.columns(len(adapters)), adapters):
+                with column:
+                    st.markdown(f"**{adapter.name}**")
+                    renderers.append(StreamingMarkdownRenderer(st.container()))
+                    captions.append(st.empty())
+                    captions[-1].caption("waiting…")
+
+            parts = [[] for _ in adapters]
+            for index, kind, payload in stream_concurrently(adapters, messages):
+                if kind == "data":
+                    parts[index].append(payload)
+                    renderers[index].feed(payload)
+                else:
+                    renderers[index].close()
+                    results[index].update(payload, content="".join(parts[index]).strip())
+                    results[index]["cost"] = usage_cost(adapters[index].model, payload["usage"], model_prices())
+                    captions[index].caption(turn_caption(results[index]))
+    return results
+
+
+def fit_context(user_prompt, system_prompt, context):
+    """Context that fits the context window of every provider about to be called, or None to cancel.
+
+    That is each compared provider, or the selected one plus its hedge backup. Every provider
+    is checked with its own token count against its own window. Oversized requests are trimmed
+    by chunk relevance when "Trim context to fit" is on, and refused up front otherwise, instead
+    of failing slowly at the provider.
+    """
+    if st.session_state.compare_enabled and st.session_state.compare_providers:
+        adapters = [get_provider(name) for name in st.session_state.compare_providers]
+    else:
+        adapters = [get_provider(st.session_state["provider"])]
+        backup = hedge_backup(adapters[0].name)
+        if backup:
+            adapters.append(backup)
+
+    # Room left for the context in each provider's window, counted with that provider's tokenizer
+    budgets = []
+    for adapter in adapters:
+        base_tokens = count_message_tokens(build_messages(user_prompt, system_prompt, adapter.backend), adapter.backend)
+        budgets.append((adapter, context_limit(adapter.model) - base_tokens))
+    too_large = [(adapter, count_tokens(context, adapter.backend)) for adapter, budget in budgets
+                 if count_tokens(context, adapter.backend) > budget]
+    if not too_large:
+        return context
+
+    names = ", ".join(adapter.name for adapter, _ in too_large)
+    context_tokens = max(tokens for _, tokens in too_large)
+    if not st.session_state.trim_context:
+        st.toast(f"⚠️ The context (≈ {context_tokens:,} tokens) doesn't fit the context window of {names}. "
+                 "Shorten it or turn on 'Trim context to fit'.")
+        return None
+    # Tightest window first; trimming for one provider never makes the context grow for another
+    for adapter, budget in sorted(budgets, key=lambda item: item[1]):
+        if count_tokens(context, adapter.backend) > budget:
+            context = trim_context_to_budget(context, user_prompt, budget, adapter.backend)
+    st.toast(f"✂️ Context trimmed from ≈ {context_tokens:,} to {count_tokens(context, adapters[0].backend):,} "
+             f"tokens to fit {names}.")
+    return context
+
+
+def answer_message(user_prompt, system_prompt, user_avatar, bot_avatar, context=""):
+    """Assistant history entry for the prompt (None if it was refused as too large);
+    in compare mode it also keeps every provider's answer."""
+    context = fit_context(user_prompt, system_prompt, context)
+    if context is None:
+        return None
+    if st.session_state.compare_enabled and st.session_state.compare_providers:
+        results = get_compare_responses(user_prompt, system_prompt, user_avatar, bot_avatar, context)
+        # The first provider's answer stands for the turn in memory
+        return {"role": "assistant", "content": results[0]["content"], "avatar": bot_avatar, "compare": results}
+    bot_response, stats = get_bot_response(user_prompt, system_prompt, user_avatar, bot_avatar, context)
+    return {"role": "assistant", "content": bot_response, "avatar": bot_avatar, "stats": stats}
+
+
 # ---------------------- Layout ----------------------
-logo_base64 = get_base64_image("photo/ai_logo_4.png")
+PROVIDERS = ["GPT-5.2", "GPT-5.2-chat", "deepseek-chat", "deepseek-reasoner", "Gemini-3"]
+logo_base64 = get_base64_image("photo/ai_logo_4.png", width=70)
 
 col_left, col_right = st.columns([1, 1.618])
 
@@ -674,6 +907,19 @@ with col_left:
         st.session_state["provider"] = "GPT-5.2"
     if "memory_enabled" not in st.session_state:
         st.session_state.memory_enabled = False
+    if "stream_enabled" not in st.session_state:
+        st.session_state.stream_enabled = True
+    if "hedge_enabled" not in st.session_state:
+        st.session_state.hedge_enabled = False
+        st.session_state.hedge_provider = "GPT-5.2-chat"
+        st.session_state.hedge_deadline = float(st.secrets.get("hedge_deadline", 8.0))
+    if "trim_context" not in st.session_state:
+        st.session_state.trim_context = bool(st.secrets.get("trim_context", True))
+    if "cache_enabled" not in st.session_state:
+        st.session_state.cache_enabled = False
+    if "compare_enabled" not in st.session_state:
+        st.session_state.compare_enabled = False
+        st.session_state.compare_providers = ["GPT-5.2", "deepseek-chat", "Gemini-3"]
 
     flex_row = st.container(horizontal=True, vertical_alignment="center", horizontal_alignment="left")
 
@@ -682,9 +928,8 @@ with col_left:
         # Setting a width allows it to shrink/grow based on content
         st.session_state["provider"] = st.selectbox(
             "Select Provider",
-            ["GPT-5.2", "GPT-5.2-chat", "deepseek-chat", "deepseek-reasoner", "Gemini-3"],
-            index=["GPT-5.2", "GPT-5.2-chat", "deepseek-chat", "deepseek-reasoner", "Gemini-3"].index(
-                st.session_state["provider"]),
+            PROVIDERS,
+            index=PROVIDERS.index(st.session_state["provider"]),
             help="test help function",
             label_visibility="collapsed"
         )
@@ -694,13 +939,64 @@ with col_left:
             value=st.session_state.memory_enabled,
             help="Enable conversation memory for context retention"
         )
-        # 3. PDF Toggle
+        # 3. Streaming Toggle
+        st.session_state.stream_enabled = st.toggle(
+            "Stream",
+            value=st.session_state.stream_enabled,
+            help="Show the answer token by token while it is being generated"
+        )
+        # 4. Hedge Toggle
+        st.session_state.hedge_enabled = st.toggle(
+            "Hedge",
+            value=st.session_state.hedge_enabled,
+            help="If the provider has not started answering by the deadline, also ask a backup provider and keep the first answer"
+        )
+        # 5. Cache Toggle
+        st.session_state.cache_enabled = st.toggle(
+            "Cache",
+            value=st.session_state.cache_enabled,
+            help="Answer an exact repeat of an earlier request (same provider, prompt, context and memory) from the cache"
+        )
+        # 6. Compare Toggle
+        st.session_state.compare_enabled = st.toggle(
+            "Compare",
+            value=st.session_state.compare_enabled,
+            help="Ask several providers at once and show their answers side by side"
+        )
+        # 7. PDF Toggle
         pdf_mode = st.toggle(
             "Read PDF",
             value=False,
             help="Upload and query PDF documents"
         )
 
+    if st.session_state.hedge_enabled:
+        hedge_row = st.container(horizontal=True, vertical_alignment="center", horizontal_alignment="left")
+        with hedge_row:
+            st.session_state.hedge_provider = st.selectbox(
+                "Backup provider",
+                PROVIDERS,
+                index=PROVIDERS.index(st.session_state.hedge_provider),
+                label_visibility="collapsed"
+            )
+            st.session_state.hedge_deadline = st.number_input(
+                "First-token deadline (s)",
+                min_value=1.0,
+                max_value=120.0,
+                value=st.session_state.hedge_deadline,
+                step=1.0,
+                help="Seconds the selected provider gets to start answering before the backup is asked"
+            )
+
+    if st.session_state.compare_enabled:
+        st.session_state.compare_providers = st.multiselect(
+            "Providers to compare",
+            PROVIDERS,
+            default=st.session_state.compare_providers,
+            max_selections=4,
+            label_visibility="collapsed"
+        )
+
     provider = st.session_state["provider"]
     mode = "PDF Context" if pdf_mode else "Text Context"
 
@@ -724,19 +1020,34 @@ with col_left:
             ),
             height=355
         )
+        # Size of the pasted context against the selected provider's window (updated when the text is applied)
+        selected = get_provider(provider)
+        context_tokens = count_tokens(st.session_state.context_input_text, selected.backend)
+        window = context_limit(selected.model)
+        size_note = f"≈ {context_tokens:,} / {window:,} tokens for {selected.name}"
+        if context_tokens > window:
+            st.warning(f"{size_note}: too large for this provider.")
+        else:
+            st.caption(size_note)
+        st.session_state.trim_context = st.checkbox(
+            "Trim context to fit",
+            value=st.session_state.trim_context,
+            help="When a request exceeds the provider's context window, send only the parts of the context most relevant to the question"
+        )
     else:
         st.markdown("<style>label[data-testid='stWidgetLabel'] {display: none;}</style>", unsafe_allow_html=True)
         uploaded_file = st.file_uploader("Upload PDF for context", type=["pdf"])
 
         if uploaded_file is not None and uploaded_file != st.session_state.get("last_uploaded_file"):
-            pdf_text = read_pdf(uploaded_file)
-            text_chunks = chunk_text(pdf_text)
-            vectorizer, tfidf_chunks = vectorize_text_chunks(text_chunks)
+            text_chunks, vectorizer, tfidf_chunks, from_cache = load_pdf_index(uploaded_file, get_pdf_index_cache())
             st.session_state.pdf_text_chunks = text_chunks
             st.session_state.pdf_vectorizer = vectorizer
             st.session_state.pdf_tfidf_chunks = tfidf_chunks
             st.session_state.last_uploaded_file = uploaded_file
-            st.success("PDF uploaded and processed successfully!")
+            if from_cache:
+                st.success("PDF uploaded; its index was already built, ready to go!")
+            else:
+                st.success("PDF uploaded and processed successfully!")
         elif uploaded_file is None:
             st.session_state.pop("pdf_text_chunks", None)
             st.session_state.pop("pdf_vectorizer", None)
@@ -758,26 +1069,28 @@ with col_left:
         if st.button("CleanUp"):
             st.session_state.messages_text = []
             st.session_state.messages_pdf = []
-            st.session_state.chat_memory = []
+            st.session_state.chat_memory.clear()
             st.success("Chat history and memory cleared!")
             st.rerun()
     user_input = st.chat_input("💬  Give AIPA a task or ask a question.")
 
 with col_right:
     with st.container(height=650, border=True):
+        # Newest messages are shown first, so a streaming answer is drawn at the top
+        stream_slot = st.empty()
         if mode == "Text Context":
             for msg in st.session_state.messages_text:
                 # Use stored avatar or fallback to get_avatar for safety
                 avatar = msg.get("avatar", get_avatar(msg['role']))
                 name = "User" if msg['role'] == "user" else "Milliona"
                 with st.chat_message(name=name, avatar=avatar):
-                    render_combined_markdown(msg['content'])
+                    render_message_content(msg)
         else:
             for msg in st.session_state.messages_pdf:
                 avatar = msg.get("avatar", get_avatar(msg['role']))
                 name = "User" if msg['role'] == "user" else "Milliona"
                 with st.chat_message(name=name, avatar=avatar):
-                    render_combined_markdown(msg['content'])
+                    render_message_content(msg)
 
     st.markdown(
         """
@@ -793,6 +1106,43 @@ with col_right:
     )
 
 # ---------------------- Handle User Input ----------------------
+def _timed(chunks, stats, start):
+    for chunk in chunks:
+        if chunk and stats.get("first_token") is None:
+            stats["first_token"] = time.perf_counter() - start
+        yield chunk
+
+
+def get_bot_response(user_prompt, system_prompt, user_avatar, bot_avatar, context=""):
+    """Answer text and its stats: latency, first-token time, usage (incl. cached tokens) and cost."""
+    provider = get_provider(st.session_state["provider"])
+    stats = {"provider": provider.name, "first_token": None, "usage": {}}
+    hedge = {}
+    start = time.perf_counter()
+    if not st.session_state.stream_enabled:
+        bot_response = chat_gpt(user_prompt, system_prompt, context, usage=stats["usage"], hedge=hedge)
+    else:
+        with stream_slot.container():
+            with st.chat_message(name="User", avatar=user_avatar):
+                st.markdown(user_input)
+            with st.chat_message(name="Milliona", avatar=bot_avatar):
+                chunks = stream_chat_gpt(user_prompt, system_prompt, context, usage=stats["usage"],
+                                         hedge=hedge)
+                bot_response = render_markdown_stream(_timed(chunks, stats, start)).strip()
+    stats["latency"] = time.perf_counter() - start
+    if hedge.get("loser"):
+        loser = get_provider(hedge["loser"])
+        stats["hedge_loser"] = loser.name
+        stats["hedge_loser_cost"] = usage_cost(loser.model, {"input_tokens": hedge["loser_input_tokens"]},
+                                               model_prices())
+    if hedge.get("provider", provider.name) != provider.name:
+        # The hedge backup answered: its tokens are the ones paid for
+        provider = get_provider(hedge["provider"])
+        stats["hedged_to"] = provider.name
+    stats["cost"] = usage_cost(provider.model, stats["usage"], model_prices())
+    return bot_response, stats
+
+
 if user_input:
     system_prompt = get_system_prompt()
     user_avatar = get_avatar("user")
@@ -800,21 +1150,23 @@ if user_input:
 
     if mode == "Text Context":
         delimiter = "'''"
-        if st.session_state.context_input_text:
-            user_prompt = f"Answer the following question. Additional materials are delimited by {delimiter} \n\nQuestion:{user_input}\n\n{delimiter}\n{st.session_state.context_input_text}\n{delimiter}"
+        context = st.session_state.context_input_text
+        if context:
+            # The materials go into the cacheable prefix (see build_messages), only the question changes per turn
+            user_prompt = f"Answer the following question using the additional materials.\n\nQuestion:{user_input}"
         else:
             user_prompt = f"Answer the following question.\n\n{delimiter}{user_input}{delimiter}"
 
-        bot_response = chat_gpt(user_prompt, system_prompt)
+        bot_message = answer_message(user_prompt, system_prompt, user_avatar, bot_avatar, context)
+        if bot_message is not None:
+            bot_response = bot_message["content"]
 
-        # Save both messages with their specific avatars
-        st.session_state.messages_text.insert(0, {"role": "assistant", "content": bot_response, "avatar": bot_avatar})
-        st.session_state.messages_text.insert(0, {"role": "user", "content": user_input, "avatar": user_avatar})
+            # Save both messages with their specific avatars
+            st.session_state.messages_text.insert(0, bot_message)
+            st.session_state.messages_text.insert(0, {"role": "user", "content": user_input, "avatar": user_avatar})
 
-        if st.session_state.memory_enabled:
-            st.session_state.chat_memory.append({"role": "user", "content": user_input})
-            st.session_state.chat_memory.append({"role": "assistant", "content": bot_response})
-            st.session_state.chat_memory = st.session_state.chat_memory[-20:]
+            if st.session_state.memory_enabled:
+                remember_turn(user_input, bot_response)
 
     else:
         if uploaded_file is not None and "pdf_text_chunks" in st.session_state:
@@ -824,19 +1176,22 @@ if user_input:
                                                               st.session_state.pdf_tfidf_chunks,
                                                               st.session_state.pdf_text_chunks)
                 delimiter = "'''"
-                user_prompt = f"Answer the following question using the provided PDF context.\n\nQuestion:\n{delimiter}{user_input}{delimiter}\n\nContext:\n{delimiter}{most_similar_chunk}{delimiter}"
-
-                bot_response = chat_gpt(user_prompt, system_prompt)
-
-                # Save both messages with their specific avatars
-                st.session_state.messages_pdf.insert(0, {"role": "assistant", "content": bot_response,
-                                                         "avatar": bot_avatar})
-                st.session_state.messages_pdf.insert(0, {"role": "user", "content": user_input, "avatar": user_avatar})
-
-                if st.session_state.memory_enabled:
-                    st.session_state.chat_memory.append({"role": "user", "content": user_input})
-                    st.session_state.chat_memory.append({"role": "assistant", "content": bot_response})
-                    st.session_state.chat_memory = st.session_state.chat_memory[-20:]
+                user_prompt = f"Answer the following question using the provided PDF context (the additional materials).\n\nQuestion:\n{delimiter}{user_input}{delimiter}"
+
+                # Document order, so the same excerpts always give the same (cacheable) prefix
+                chunk_order = {chunk: i for i, chunk in enumerate(st.session_state.pdf_text_chunks)}
+                pdf_context = "\n\n".join(sorted(most_similar_chunk, key=chunk_order.get))
+                bot_message = answer_message(user_prompt, system_prompt, user_avatar, bot_avatar,
+                                             context=pdf_context)
+                if bot_message is not None:
+                    bot_response = bot_message["content"]
+
+                    # Save both messages with their specific avatars
+                    st.session_state.messages_pdf.insert(0, bot_message)
+                    st.session_state.messages_pdf.insert(0, {"role": "user", "content": user_input, "avatar": user_avatar})
+
+                    if st.session_state.memory_enabled:
+                        remember_turn(user_input, bot_response)
         else:
             st.warning("Please upload and process a PDF before asking questions.")
 
@@ -1,18 +1,93 @@
 import streamlit as st
-from openai import OpenAI
-from PIL import Image
-from utils.graphic_pro import get_base64_image
+from utils.graphic_pro import get_base64_image, load_image
+from utils.provider_pro import get_provider
+from utils.llm_pro import call_llm, stream_llm
+from utils.cache_pro import DiskCache, cache_path
+from concurrent.futures import ThreadPoolExecutor, wait
+import threading
 import json
 import re
+import unicodedata
 
 # =============================
 # Setup
 # =============================
-client = OpenAI(api_key=st.secrets["ai_key"])
-OpenAI.api_key = st.secrets["ai_key"]
+# API clients are shared per process and created on first use (see utils/client_pro.py)
 
 # client_deepseek = OpenAI(api_key=st.secrets["deepseek_key"], base_url="https://api.deepseek.com")
 
+# Bump when the explanation or question-bank prompts change, so old cached lessons are not served
+WORD_PROMPT_VERSION = "v1"
+# Words per request when a whole word list is prepared in batch mode
+WORD_BATCH_SIZE = 8
+
+
+@st.cache_resource
+def get_word_cache():
+    # Word lessons are the same for every student, so one cache serves all sessions
+    return DiskCache(cache_path("aitc_words"), ttl=30 * 24 * 3600, max_entries=20000)
+
+
+@st.cache_resource
+def get_background_executor():
+    # Question banks are generated here so the page stays usable while they are built
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="aitc-background")
+
+
+class WordPrefetcher:
+    """Bounded background queue that fills the word cache ahead of the students.
+
+    At most `max_pending` words are queued at once and each word is queued only once
+    while it is in flight, no matter how many sessions ask for it.
+    """
+
+    def __init__(self, max_workers=2, max_pending=200):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="aitc-prefetch")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self.max_pending = max_pending
+
+    def _drop_finished(self):
+        self._jobs = {key: job for key, job in self._jobs.items() if not job.done()}
+
+    def submit(self, key, fn, *args) -> bool:
+        with self._lock:
+            self._drop_finished()
+            if key in self._jobs or len(self._jobs) >= self.max_pending:
+                return False
+            self._jobs[key] = self._executor.submit(fn, *args)
+            return True
+
+    def submit_batch(self, keys, fn, *args) -> bool:
+        """Queue one job that covers several keys (e.g. one LLM request for several words)."""
+        with self._lock:
+            self._drop_finished()
+            if any(key in self._jobs for key in keys) or len(self._jobs) + len(keys) > self.max_pending:
+                return False
+            job = self._executor.submit(fn, *args)
+            for key in keys:
+                self._jobs[key] = job
+            return True
+
+    def job(self, key):
+        with self._lock:
+            job = self._jobs.get(key)
+        return job if job is not None and not job.done() else None
+
+    def pending(self) -> int:
+        with self._lock:
+            self._drop_finished()
+            return len(self._jobs)
+
+
+@st.cache_resource
+def get_word_prefetcher():
+    return WordPrefetcher()
+
+
+word_cache = get_word_cache()
+
+
 if "authenticated" not in st.session_state or not st.session_state["authenticated"]:
     st.warning("You must log in first.")
     st.stop()
@@ -26,7 +101,7 @@ if st.sidebar.button("Logout"):
     st.session_state["username"] = ""
     st.switch_page("main.py")
 st.sidebar.markdown("---")
-sidebar_logo = Image.open("photo/ai_logo_4.png")
+sidebar_logo = load_image("photo/ai_logo_4.png", width=300)
 st.sidebar.image(sidebar_logo, use_container_width=True)
 
 
@@ -52,22 +127,33 @@ st.sidebar.image(sidebar_logo, use_container_width=True)
 #         return f"Error: {e}"
 
 # OpenAI wrapper (GPT-5.2 compatible)
+llm = get_provider("GPT-5.2")
+
+
+def _as_messages(prompt: str):
+    return [{"role": "user", "content": prompt}]
+
+
 def chat_gpt(prompt: str) -> str:
     try:
-        resp = client.responses.create(
-            model="gpt-5.2",
-            input=prompt,
-        )
-
-        # GPT-5.x returns text via output_text
-        return resp.output_text.strip()
+        # Timeouts, retries with backoff and the circuit breaker live in utils/llm_pro.py
+        return call_llm(llm.backend, llm.complete, _as_messages(prompt))
 
     except Exception as e:
         return f"Error: {e}"
 
 
+def stream_chat_gpt(prompt: str):
+    """chat_gpt that yields the answer piece by piece as GPT-5.2 produces it.
+
+    Errors are raised, not yielded: part of the answer may already be on screen,
+    and the caller must not mistake a cut-off answer for a complete one.
+    """
+    yield from stream_llm(llm.backend, llm.stream, _as_messages(prompt))
+
+
 # Header
-logo_base64 = get_base64_image("photo/ai_logo_4.png")
+logo_base64 = get_base64_image("photo/ai_logo_4.png", width=100)
 st.markdown(
     f"""
 <div style='display: flex; align-items: center; gap: 20px;'>
@@ -101,6 +187,12 @@ def _normalize_text(x) -> str:
     return s
 
 
+def _word_key(word) -> str:
+    """Identity of a vocabulary word for caching and batching. Unlike _normalize_text it keeps
+    accents and non-Latin scripts, so 苹果 and 香蕉 (or café and caf) stay different words."""
+    return " ".join(unicodedata.normalize("NFKC", str(word)).casefold().split())
+
+
 def _normalize_any(x):
     if isinstance(x, list):
         return [_normalize_text(i) for i in x]
@@ -153,13 +245,10 @@ if mode == "Word Learning Mode":
         user_input_word = st.text_input("Enter a word to learn:")
 
 
-        def explain_word(word: str) -> str:
-            prompt = f"""
-                    You are teaching an 8-year-old Chinese child the English word "{word}".
-                    Follow these steps:
-
+        def explanation_steps(subject: str) -> str:
+            return f"""
                     1. **Meaning 意思**
-                    - Explain the meaning of "{word}" in simple English (for a child).
+                    - Explain the meaning of {subject} in simple English (for a child).
                     - Give the meaning in Chinese.
 
                     2. **Word Forms 形式**
@@ -170,14 +259,64 @@ if mode == "Word Learning Mode":
                     3. **Example Sentences 例句**
                     - For each form, give one short, clear English sentence.
                     - Provide the Chinese translation for each sentence.
-                    - Keep sentences age-appropriate and easy to understand.
+                    - Keep sentences age-appropriate and easy to understand."""
+
+
+        def explain_word_prompt(word: str) -> str:
+            return f"""
+                    You are teaching an 8-year-old Chinese child the English word "{word}".
+                    Follow these steps:
+{explanation_steps(f'"{word}"')}
+
+                    Use a friendly and encouraging tone suitable for children.
+                    """
+
+
+        def explain_word(word: str) -> str:
+            return chat_gpt(explain_word_prompt(word))
+
+
+        def parse_json_reply(raw: str):
+            """json.loads that tolerates a ```json fence around the reply; None when it is not JSON."""
+            text = re.sub(r"^```(?:json)?\s*|\s*```$", "", raw.strip())
+            try:
+                return json.loads(text)
+            except Exception:
+                return None
+
+
+        def explain_words_batch(words):
+            """One request explaining several words. Returns {normalized word: explanation}."""
+            prompt = f"""
+                    You are teaching an 8-year-old Chinese child these English words: {json.dumps(words, ensure_ascii=False)}
+                    For EACH word, write a separate explanation in Markdown that follows these steps:
+{explanation_steps("the word")}
 
                     Use a friendly and encouraging tone suitable for children.
+                    Return STRICT JSON ONLY, no prose: one object whose keys are exactly the words above
+                    and whose values are the Markdown explanations, e.g. {{"apple": "1. **Meaning 意思** ..."}}
                     """
-            return chat_gpt(prompt)
+            raw = chat_gpt(prompt)
+            if raw.startswith("Error:"):
+                return {}
+            reply = parse_json_reply(raw)
+            if not isinstance(reply, dict):
+                return {}
+            return {_word_key(w): str(e).strip() for w, e in reply.items() if str(e).strip()}
 
 
         # ---------- Build a question bank of 10 items at once ----------
+        QUESTION_BANK_RULES = """\
+                    - Base EVERYTHING ONLY on the explanation above.
+                    - Difficulty should increase from Q1 (very easy) to Q10 (hard).
+                    - Mix of types: use "multiple_choice", "fill_blank", and "short_answer".
+                    * Include at least 3 different types across the 10 questions.
+                    * Avoid using the same type more than twice in a row.
+                    - Keep language simple for an 8-year-old Chinese student.
+                    - For multiple choice, include 3–4 options; make the correct answer clear and the "answer" MUST be exactly one of the choices.
+                    - For all answers, ALWAYS return a string (even if the answer is a number)."""
+
+
         def build_question_bank_from_explanation(word: str, explanation: str):
             """
             Ask GPT for a bank of 10 questions with increasing difficulty and mixed types.
@@ -191,14 +330,7 @@ if mode == "Word Learning Mode":
 
                     Create exactly 10 questions to help the student consolidate understanding of the word "{word}".
                     Rules:
-                    - Base EVERYTHING ONLY on the explanation above.
-                    - Difficulty should increase from Q1 (very easy) to Q10 (hard).
-                    - Mix of types: use "multiple_choice", "fill_blank", and "short_answer".
-                    * Include at least 3 different types across the 10 questions.
-                    * Avoid using the same type more than twice in a row.
-                    - Keep language simple for an 8-year-old Chinese student.
-                    - For multiple choice, include 3–4 options; make the correct answer clear and the "answer" MUST be exactly one of the choices.
-                    - For all answers, ALWAYS return a string (even if the answer is a number).
+{QUESTION_BANK_RULES}
                     - Return STRICT JSON ONLY, no prose, as:
                     [
                     {{
@@ -223,6 +355,11 @@ if mode == "Word Learning Mode":
             except Exception:
                 return None
 
+            return clean_question_bank(word, bank)
+
+
+        def clean_question_bank(word: str, bank: list):
+            """Sanitize raw question items from GPT into exactly 10 well-formed questions."""
             # Sanitize / coerce items
             cleaned = []
             for item in bank[:10]:
@@ -283,6 +420,144 @@ if mode == "Word Learning Mode":
             return cleaned[:10]
 
 
+        def build_question_banks_batch(explanations: dict):
+            """One request for the banks of several words ({word: explanation}). Returns {_word_key(word): bank}."""
+            sections = "\n\n".join(f'WORD: "{w}"\nEXPLANATION:\n{e}' for w, e in explanations.items())
+            prompt = f"""
+                    You are an AI English teacher. The student learned these explanations:
+
+                    {sections}
+
+                    For EACH word above, create exactly 10 questions to help the student consolidate understanding of that word.
+                    Rules:
+{QUESTION_BANK_RULES}
+                    - Return STRICT JSON ONLY, no prose: one object whose keys are exactly the words above and
+                      whose values are lists of 10 questions (ids 1..10, difficulty 1..10), each as:
+                    {{
+                        "id": 1,
+                        "difficulty": 1,
+                        "type": "multiple_choice" | "fill_blank" | "short_answer",
+                        "question": "string",
+                        "choices": ["string","string","string"],   // omit for non-MC
+                        "answer": "string"
+                    }}
+                    """
+            raw = chat_gpt(prompt)
+            if raw.startswith("Error:"):
+                return {}
+            reply = parse_json_reply(raw)
+            if not isinstance(reply, dict):
+                return {}
+            words = {_word_key(w): w for w in explanations}
+            return {
+                norm: clean_question_bank(words[norm], bank)
+                for norm, bank in ((_word_key(w), b) for w, b in reply.items())
+                if norm in words and isinstance(bank, list)
+            }
+
+
+        def word_cache_key(word: str):
+            """Shared cache key of a word's lesson, or None for input with nothing to key on (never cached)."""
+            key = _word_key(word)
+            return f"{WORD_PROMPT_VERSION}:{key}" if key else None
+
+
+        def store_word_lesson(word: str, explanation: str, bank):
+            if bank and not explanation.startswith("Error:") and word_cache_key(word):
+                word_cache.set(word_cache_key(word), {"explanation": explanation, "quiz_bank": bank})
+
+
+        def get_word_lesson(word: str):
+            """Explanation and 10-question bank for a word, served from the shared cache when possible."""
+            lesson = word_cache.get(word_cache_key(word)) if word_cache_key(word) else None
+            if lesson:
+                return lesson["explanation"], lesson["quiz_bank"]
+
+            explanation = explain_word(word)
+            bank = build_question_bank_from_explanation(word, explanation)
+            store_word_lesson(word, explanation, bank)
+            return explanation, bank
+
+
+        def prefetch_word_lesson(word: str):
+            if word_cache_key(word) not in word_cache:
+                get_word_lesson(word)
+
+
+        def prepare_word_lessons_batch(words):
+            """Fill the word cache for several words with two requests in total (explanations, then banks)."""
+            words = [w for w in words if word_cache_key(w) not in word_cache]
+            if not words:
+                return
+            explanations = explain_words_batch(words)
+            found = {w: explanations[_word_key(w)] for w in words if _word_key(w) in explanations}
+            banks = build_question_banks_batch(found) if found else {}
+
+            for word in words:
+                if word not in found:
+                    # Missing from the batch reply: fall back to the one-word requests
+                    get_word_lesson(word)
+                    continue
+                bank = banks.get(_word_key(word)) or build_question_bank_from_explanation(word, found[word])
+                store_word_lesson(word, found[word], bank)
+
+
+        def parse_word_list(raw: str, limit: int = 200):
+            """One word (or short phrase) per line; commas, semicolons and tabs also separate words."""
+            words, seen = [], set()
+            for item in re.split(r"[\n\r,;\t]+", raw):
+                word = item.strip()
+                # Words without a cache key can't be prefetched; they are still explained when typed
+                if _word_key(word) and _word_key(word) not in seen:
+                    seen.add(_word_key(word))
+                    words.append(word)
+            return words[:limit]
+
+
+        def build_and_store_question_bank(word: str, explanation: str):
+            # Runs on the background executor: no Streamlit calls in here
+            bank = build_question_bank_from_explanation(word, explanation)
+            store_word_lesson(word, explanation, bank)
+            return bank
+
+
+        # Optional vocabulary list: generate every lesson in the background before it is needed
+        with st.expander("📚 Lesson word list (optional)"):
+            batch_mode = st.toggle(
+                "Batch requests",
+                value=True,
+                help=f"Prepare {WORD_BATCH_SIZE} words per request instead of one request per word."
+            )
+            word_file = st.file_uploader("Upload the lesson's words (.txt or .csv)", type=["txt", "csv"])
+            if word_file is not None and word_file.file_id != st.session_state.get("prefetch_file_id"):
+                st.session_state.prefetch_file_id = word_file.file_id
+                st.session_state.prefetch_words = parse_word_list(word_file.getvalue().decode("utf-8", errors="ignore"))
+                prefetcher = get_word_prefetcher()
+                cached = word_cache.present(word_cache_key(word) for word in st.session_state.prefetch_words)
+                todo = [
+                    word for word in st.session_state.prefetch_words
+                    if word_cache_key(word) not in cached and prefetcher.job(word_cache_key(word)) is None
+                ]
+                if batch_mode:
+                    for i in range(0, len(todo), WORD_BATCH_SIZE):
+                        batch = todo[i:i + WORD_BATCH_SIZE]
+                        prefetcher.submit_batch([word_cache_key(w) for w in batch], prepare_word_lessons_batch, batch)
+                else:
+                    for word in todo:
+                        prefetcher.submit(word_cache_key(word), prefetch_word_lesson, word)
+            elif word_file is None:
+                st.session_state.pop("prefetch_file_id", None)
+                st.session_state.pop("prefetch_words", None)
+
+            if st.session_state.get("prefetch_words"):
+                @st.fragment(run_every=3)
+                def show_prefetch_progress():
+                    words = st.session_state.prefetch_words
+                    ready = len(word_cache.present(word_cache_key(word) for word in words))
+                    st.caption(f"✅ {ready}/{len(words)} words ready · {get_word_prefetcher().pending()} being prepared")
+
+                show_prefetch_progress()
+
         # When a new word is entered → explain + reset + build bank
         if user_input_word and user_input_word != st.session_state.last_word_input:
             st.session_state.last_word_input = user_input_word
@@ -293,14 +568,37 @@ if mode == "Word Learning Mode":
             st.session_state.feedback = ""
             st.session_state.quiz_bank = []  # will fill below
             st.session_state.last_answer_submitted_for = None
+            st.session_state.quiz_bank_job = None
+
+            # A word from the lesson list may be being prepared right now: wait for it instead of asking twice.
+            # One still queued behind other words is not waited for; it skips the word once it is cached.
+            key = word_cache_key(user_input_word)
+            prefetch_job = get_word_prefetcher().job(key) if key else None
+            if prefetch_job is not None and prefetch_job.running():
+                with st.spinner("Almost ready..."):
+                    wait([prefetch_job])
+
+            lesson = word_cache.get(key) if key else None
+            if lesson:
+                st.session_state.current_explanation = lesson["explanation"]
+                st.session_state.quiz_bank = lesson["quiz_bank"]
+            else:
+                # Show the explanation while it streams in ...
+                st.markdown(f"### Word: **{user_input_word}**")
+                try:
+                    explanation = st.write_stream(stream_chat_gpt(explain_word_prompt(user_input_word)))
+                except Exception as e:
+                    # A failed (possibly half-written) explanation gets no quiz and is never cached
+                    st.session_state.current_explanation = f"Error: {e}"
+                else:
+                    if not isinstance(explanation, str):
+                        explanation = "".join(map(str, explanation))
+                    explanation = explanation.strip()
+                    st.session_state.current_explanation = explanation
 
-            # Get explanation
-            explanation = explain_word(user_input_word)
-            st.session_state.current_explanation = explanation
-
-            # Build question bank (10 at once)
-            bank = build_question_bank_from_explanation(user_input_word, explanation)
-            st.session_state.quiz_bank = bank or []
+                    # ... then build the question bank (10 at once) in the background
+                    future = get_background_executor().submit(build_and_store_question_bank, user_input_word, explanation)
+                    st.session_state.quiz_bank_job = (user_input_word, future)
 
             st.rerun()
 
@@ -325,6 +623,25 @@ if mode == "Word Learning Mode":
             st.info("Please enter a word on the left to start the quiz.")
             st.stop()
 
+        # Question bank still being generated in the background for the current word
+        job = st.session_state.get("quiz_bank_job")
+        if job is not None and job[0] == st.session_state.current_word:
+            if job[1].done():
+                st.session_state.quiz_bank_job = None
+                try:
+                    st.session_state.quiz_bank = job[1].result() or []
+                except Exception:
+                    st.session_state.quiz_bank = []
+            else:
+                @st.fragment(run_every=1)
+                def wait_for_quiz_bank():
+                    if job[1].done():
+                        st.rerun()
+                    st.info("🧩 Preparing 10 practice questions...")
+
+                wait_for_quiz_bank()
+                st.stop()
+
         # --------------------------------
         # AFTER 10 QUESTIONS → Free sentence practice
         # --------------------------------
@@ -378,6 +695,7 @@ if mode == "Word Learning Mode":
                 bank = build_question_bank_from_explanation(
                     st.session_state.current_word, st.session_state.current_explanation
                 )
+                store_word_lesson(st.session_state.current_word, st.session_state.current_explanation, bank)
                 st.session_state.quiz_bank = bank or []
                 st.rerun()
             st.warning("No questions generated yet for this word.")
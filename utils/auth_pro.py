@@ -0,0 +1,176 @@
+# utils/auth_pro.py
+import hashlib
+import hmac
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from gspread.utils import rowcol_to_a1
+
+
+class UserStore(ABC):
+    """Where login accounts live. Backends: GoogleSheetUserStore, SQLiteUserStore."""
+
+    @abstractmethod
+    def verify(self, username: str, password: str) -> bool:
+        ...
+
+    @abstractmethod
+    def exists(self, username: str) -> bool:
+        ...
+
+    @abstractmethod
+    def add(self, username: str, password: str):
+        ...
+
+
+class GoogleSheetUserStore(UserStore):
+    """Users sheet (username, password columns), served from a process-wide in-memory copy.
+
+    Rows appended since the last read are fetched every `refresh_interval` seconds
+    (registrations only ever append); a full reload every `full_refresh_interval`
+    seconds picks up edited or deleted rows.
+    """
+
+    def __init__(self, worksheet, refresh_interval=60, full_refresh_interval=900):
+        self._sheet = worksheet
+        self.refresh_interval = refresh_interval
+        self.full_refresh_interval = full_refresh_interval
+        self._lock = threading.Lock()
+        self._users = {}
+        self._columns = (0, 1)  # username, password column indexes
+        self._rows_loaded = 0   # data rows read so far (header excluded)
+        self._last_refresh = 0.0
+        self._last_full_refresh = 0.0
+
+    def _full_reload(self):
+        values = self._sheet.get_all_values()
+        header = values[0] if values else []
+        if "username" in header and "password" in header:
+            self._columns = (header.index("username"), header.index("password"))
+        # Built aside and swapped in at once: logins read _users without the lock
+        users = {}
+        self._add_rows(values[1:], users)
+        self._users = users
+        self._rows_loaded = max(len(values) - 1, 0)
+        self._last_full_refresh = self._last_refresh = time.time()
+
+    def _load_new_rows(self):
+        last_column = rowcol_to_a1(1, max(self._columns) + 1).rstrip("0123456789")
+        rows = self._sheet.get_values(f"A{self._rows_loaded + 2}:{last_column}")
+        if rows == [[]]:  # nothing new
+            rows = []
+        self._add_rows(rows, self._users)
+        self._rows_loaded += len(rows)
+        self._last_refresh = time.time()
+
+    def _add_rows(self, rows, users):
+        u, p = self._columns
+        for row in rows:
+            if len(row) > max(u, p) and row[u]:
+                users[str(row[u]).strip()] = str(row[p])
+
+    def refresh(self, force=False):
+        now = time.time()
+        if not force and now - self._last_refresh < self.refresh_interval:
+            return
+        # Only one session talks to Google at a time; the others keep using the current copy
+        if not self._lock.acquire(blocking=not self._last_full_refresh):
+            return
+        try:
+            if not self._last_full_refresh or now - self._last_full_refresh >= self.full_refresh_interval:
+                self._full_reload()
+            elif force or now - self._last_refresh >= self.refresh_interval:
+                self._load_new_rows()
+        finally:
+            self._lock.release()
+
+    def _get_password(self, username):
+        self.refresh()
+        if username not in self._users and time.time() - self._last_refresh > 5:
+            # Unknown user: they may have just registered from another process
+            self.refresh(force=True)
+        return self._users.get(username)
+
+    def verify(self, username, password):
+        stored = self._get_password(username)
+        return stored is not None and stored == password
+
+    def exists(self, username):
+        return self._get_password(username) is not None
+
+    def add(self, username, password):
+        self._sheet.append_row([username, password])
+        # The appended row itself is read again by the next refresh, which keeps row counting exact
+        self._users[username] = password
+
+
+def hash_password(password: str, iterations: int = 200_000) -> str:
+    salt = secrets.token_hex(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), bytes.fromhex(salt), iterations)
+    return f"pbkdf2_sha256${iterations}${salt}${digest.hex()}"
+
+
+def check_password(password: str, stored: str) -> bool:
+    try:
+        algorithm, iterations, salt, expected = stored.split("$")
+    except ValueError:
+        return False
+    if algorithm != "pbkdf2_sha256":
+        return False
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), bytes.fromhex(salt), int(iterations))
+    return hmac.compare_digest(digest.hex(), expected)
+
+
+class SQLiteUserStore(UserStore):
+    """Local users table (username is the primary key, passwords are salted PBKDF2 hashes).
+
+    No network round trips, so it also serves offline runs and load tests.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS users (
+                    username TEXT PRIMARY KEY,
+                    password_hash TEXT NOT NULL,
+                    created REAL NOT NULL
+                )
+                """
+            )
+
+    @contextmanager
+    def _connection(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _get_hash(self, username):
+        with self._connection() as conn:
+            row = conn.execute("SELECT password_hash FROM users WHERE username = ?", (username,)).fetchone()
+        return row[0] if row else None
+
+    def verify(self, username, password):
+        stored = self._get_hash(username)
+        return stored is not None and check_password(password, stored)
+
+    def exists(self, username):
+        return self._get_hash(username) is not None
+
+    def add(self, username, password):
+        """Raises sqlite3.IntegrityError if the username is taken; existing accounts are never overwritten."""
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO users (username, password_hash, created) VALUES (?, ?, ?)",
+                (username, hash_password(password), time.time()),
+            )
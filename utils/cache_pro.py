@@ -0,0 +1,132 @@
+# utils/cache_pro.py
+import os
+import pickle
+import sqlite3
+import time
+from contextlib import contextmanager
+
+# Shared on-disk caches live here (one SQLite file per cache)
+CACHE_DIR = os.environ.get("AITC_CACHE_DIR", ".cache")
+
+
+def cache_path(name: str) -> str:
+    return os.path.join(CACHE_DIR, f"{name}.sqlite3")
+
+
+class DiskCache:
+    """SQLite-backed key/value store shared by every session and process of the app.
+
+    Values are pickled. Entries older than `ttl` seconds are dropped (None keeps them
+    forever); past `max_entries` or `max_bytes` the least recently used entries are evicted.
+    """
+
+    def __init__(self, path, ttl=None, max_entries=None, max_bytes=None):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+    @contextmanager
+    def _connection(self):
+        # One short-lived connection per call keeps the cache safe to use from any thread
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._connection() as conn:
+            row = conn.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return default
+            if self.ttl is not None and row[1] < now - self.ttl:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return default
+            conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        try:
+            return pickle.loads(row[0])
+        except Exception:
+            self.delete(key)
+            return default
+
+    def __contains__(self, key):
+        # Read-only check: does not count as a use for LRU purposes
+        with self._connection() as conn:
+            row = conn.execute("SELECT created FROM entries WHERE key = ?", (key,)).fetchone()
+        return row is not None and (self.ttl is None or row[0] >= time.time() - self.ttl)
+
+    def present(self, keys):
+        """The subset of `keys` that are cached, in one query per 500 keys (read-only, like `in`)."""
+        keys = list(keys)
+        found = set()
+        oldest = None if self.ttl is None else time.time() - self.ttl
+        with self._connection() as conn:
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                for key, created in conn.execute(
+                    f"SELECT key, created FROM entries WHERE key IN ({placeholders})", batch
+                ):
+                    if oldest is None or created >= oldest:
+                        found.add(key)
+        return found
+
+    def set(self, key, value):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, sqlite3.Binary(data), len(data), now, now),
+            )
+            self._evict(conn, now)
+
+    def delete(self, key):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM entries")
+
+    def _evict(self, conn, now):
+        if self.ttl is not None:
+            conn.execute("DELETE FROM entries WHERE created < ?", (now - self.ttl,))
+
+        if self.max_entries is not None:
+            (count,) = conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+        if self.max_bytes is not None:
+            (total,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+            if total > self.max_bytes:
+                stale = []
+                for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    stale.append((key,))
+                    total -= size
+                conn.executemany("DELETE FROM entries WHERE key = ?", stale)
@@ -0,0 +1,61 @@
+# utils/client_pro.py
+import httpx
+import streamlit as st
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+from utils.llm_pro import provider_timeout
+
+# One client per provider and process, built on first use and shared by every
+# session, page and rerun. Each keeps a pooled HTTP connection, so warm requests
+# skip the TLS handshake. Retries are left to utils/llm_pro.py, so the SDKs' own are off.
+
+DEEPSEEK_BASE_URL = "https://api.deepseek.com"
+GSHEET_SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+
+HTTP_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60)
+
+
+def _pooled_http_client():
+    return DefaultHttpxClient(limits=HTTP_LIMITS)
+
+
+@st.cache_resource(show_spinner=False)
+def get_openai_client() -> OpenAI:
+    return OpenAI(api_key=st.secrets["ai_key"], http_client=_pooled_http_client(),
+                  timeout=provider_timeout("openai"), max_retries=0)
+
+
+@st.cache_resource(show_spinner=False)
+def get_deepseek_client() -> OpenAI:
+    return OpenAI(api_key=st.secrets["deepseek_key"], base_url=DEEPSEEK_BASE_URL, http_client=_pooled_http_client(),
+                  timeout=provider_timeout("deepseek"), max_retries=0)
+
+
+# Async clients are only used from the event loop in utils/provider_pro.py (their pools are loop-bound)
+@st.cache_resource(show_spinner=False)
+def get_async_openai_client() -> AsyncOpenAI:
+    return AsyncOpenAI(api_key=st.secrets["ai_key"], http_client=DefaultAsyncHttpxClient(limits=HTTP_LIMITS),
+                       timeout=provider_timeout("openai"), max_retries=0)
+
+
+@st.cache_resource(show_spinner=False)
+def get_async_deepseek_client() -> AsyncOpenAI:
+    return AsyncOpenAI(api_key=st.secrets["deepseek_key"], base_url=DEEPSEEK_BASE_URL,
+                       http_client=DefaultAsyncHttpxClient(limits=HTTP_LIMITS),
+                       timeout=provider_timeout("deepseek"), max_retries=0)
+
+
+@st.cache_resource(show_spinner=False)
+def get_gemini_client():
+    from google import genai
+    from google.genai import types
+    # HttpOptions.timeout is in milliseconds
+    return genai.Client(api_key=st.secrets["GEMINI_API_KEY"],
+                        http_options=types.HttpOptions(timeout=int(provider_timeout("gemini") * 1000)))
+
+
+@st.cache_resource(show_spinner=False)
+def get_gsheet_client():
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
+    creds = ServiceAccountCredentials.from_json_keyfile_dict(st.secrets["gcp_service_account"], GSHEET_SCOPE)
+    return gspread.authorize(creds)
@@ -1,7 +1,164 @@
 # utils/graphic_pro.py
 import base64
+import io
+import json
+import os
+import mimetypes
+import threading
+import streamlit as st
+from PIL import Image
 
-def get_base64_image(image_path):
-    with open(image_path, "rb") as img_file:
-        encoded = base64.b64encode(img_file.read()).decode()
-    return f"data:image/png;base64,{encoded}"
\ No newline at end of file
+# Images are downscaled to this multiple of their display width, so they stay sharp on HiDPI screens
+HIDPI_SCALE = 2
+
+# --- Optimized asset variants ---
+# Resized WebP copies of the photo/ assets, one per display width they are used at.
+# Built once per process at startup (or ahead of time with `python -m utils.graphic_pro`)
+# and looked up through the manifest; anything missing or stale falls back to the original file.
+OPTIMIZED_DIR = "photo/optimized"
+MANIFEST_PATH = os.path.join(OPTIMIZED_DIR, "manifest.json")
+WEBP_QUALITY = 85
+AVATAR_WIDTH = 32  # st.chat_message avatars are 2rem wide
+
+ASSET_WIDTHS = {
+    "photo/ai_logo_4.png": [70, 100, 300, 900],
+    "photo/user.png": [AVATAR_WIDTH],
+    "photo/ai_logo_chatgpt_small_1.png": [AVATAR_WIDTH],
+    "photo/ai_logo_avatat.png": [AVATAR_WIDTH],
+    "photo/ai_logo_gemini_avatat.png": [AVATAR_WIDTH],
+}
+
+_manifest_lock = threading.Lock()
+
+
+def _mtime(path):
+    # Part of every cache key: replacing a file on disk invalidates its cached versions
+    return os.path.getmtime(path)
+
+
+def _mime_type(path):
+    return mimetypes.guess_type(path)[0] or "image/png"
+
+
+def _asset_key(path):
+    return os.path.normpath(path).replace(os.sep, "/")
+
+
+def _variant_path(path, width):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return f"{OPTIMIZED_DIR}/{stem}-{width}w.webp"
+
+
+def _load_manifest():
+    try:
+        with open(MANIFEST_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def build_optimized_assets(asset_widths=None):
+    """Write WebP variants for every (asset, display width) pair that is missing or stale; return the manifest."""
+    asset_widths = ASSET_WIDTHS if asset_widths is None else asset_widths
+    with _manifest_lock:
+        manifest = _load_manifest()
+        changed = False
+        for path, widths in asset_widths.items():
+            key = _asset_key(path)
+            if not os.path.exists(key):
+                continue
+            mtime = _mtime(key)
+            entry = manifest.get(key)
+            if not entry or entry.get("mtime") != mtime:
+                entry = manifest[key] = {"mtime": mtime, "variants": {}}
+                changed = True
+            for width in widths:
+                out_path = _variant_path(key, width)
+                if str(width) in entry["variants"] and os.path.exists(out_path):
+                    continue
+                os.makedirs(OPTIMIZED_DIR, exist_ok=True)
+                with Image.open(key) as img:
+                    target = min(int(width * HIDPI_SCALE), img.width)
+                    height = max(1, round(img.height * target / img.width))
+                    img = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+                    img.resize((target, height), Image.LANCZOS).save(out_path, format="WEBP", quality=WEBP_QUALITY, method=6)
+                entry["variants"][str(width)] = out_path
+                changed = True
+        if changed:
+            tmp_path = MANIFEST_PATH + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, MANIFEST_PATH)
+        return manifest
+
+
+@st.cache_resource(show_spinner=False)
+def ensure_optimized_assets():
+    try:
+        return build_optimized_assets()
+    except OSError:
+        # Read-only checkout: serve whatever variants already exist
+        return _load_manifest()
+
+
+def optimized_image_path(image_path, width):
+    """Path of the WebP variant of `image_path` for `width`, or `image_path` itself when there is none."""
+    key = _asset_key(image_path)
+    entry = ensure_optimized_assets().get(key)
+    if not width or not entry or not os.path.exists(key) or entry.get("mtime") != _mtime(key):
+        return image_path
+    variant = entry["variants"].get(str(width))
+    return variant if variant and os.path.exists(variant) else image_path
+
+
+def _resize_image(path, width):
+    """Return (bytes, mime type) of the image, downscaled to `width` * HIDPI_SCALE pixels wide when smaller."""
+    with open(path, "rb") as img_file:
+        data = img_file.read()
+    if not width:
+        return data, _mime_type(path)
+
+    with Image.open(io.BytesIO(data)) as img:
+        target = int(width * HIDPI_SCALE)
+        if img.width <= target:
+            return data, _mime_type(path)
+        height = max(1, round(img.height * target / img.width))
+        resized = img.resize((target, height), Image.LANCZOS)
+        out = io.BytesIO()
+        if resized.mode in ("RGBA", "LA", "P"):
+            resized.save(out, format="PNG", optimize=True)
+            return out.getvalue(), "image/png"
+        resized.convert("RGB").save(out, format="JPEG", quality=90)
+        return out.getvalue(), "image/jpeg"
+
+
+@st.cache_data(show_spinner=False, max_entries=100)
+def _encoded_image(path, mtime, width):
+    data, mime = _resize_image(path, width)
+    return f"data:{mime};base64,{base64.b64encode(data).decode()}"
+
+
+@st.cache_data(show_spinner=False, max_entries=100)
+def _image_bytes(path, mtime, width):
+    return _resize_image(path, width)[0]
+
+
+def get_base64_image(image_path, width=None):
+    """Data URI for an <img> tag; pass the displayed width to avoid shipping the full-size file."""
+    path = optimized_image_path(image_path, width)
+    if path != image_path:
+        return _encoded_image(path, _mtime(path), None)
+    return _encoded_image(image_path, _mtime(image_path), width)
+
+
+def load_image(image_path, width=None):
+    """Encoded image bytes for st.image / st.sidebar.image, read and resized once per file version."""
+    path = optimized_image_path(image_path, width)
+    if path != image_path:
+        return _image_bytes(path, _mtime(path), None)
+    return _image_bytes(image_path, _mtime(image_path), width)
+
+
+if __name__ == "__main__":
+    for asset, entry in sorted(build_optimized_assets().items()):
+        print(asset, "->", ", ".join(entry["variants"].values()))
@@ -0,0 +1,451 @@
+# utils/llm_pro.py
+import asyncio
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+import httpx
+import openai
+
+# --- Per-provider settings ---
+# Seconds before a request (or a stalled stream) is abandoned; reasoning models think for a while
+PROVIDER_TIMEOUTS = {
+    "openai": 90,
+    "deepseek": 180,
+    "gemini": 120,
+}
+DEFAULT_TIMEOUT = 90
+# A non-streamed answer only arrives once the model has finished thinking, so those calls
+# wait longer (the SDKs' own default), and a call that still times out is not retried: each
+# try is billed and would most likely time out again
+COMPLETION_TIMEOUT = 600
+
+MAX_ATTEMPTS = 3
+BACKOFF_BASE = 0.5  # seconds
+BACKOFF_CAP = 8.0
+
+# Consecutive failures before a provider is skipped, and how long before it is tried again
+BREAKER_FAILURES = 5
+BREAKER_RESET = 30.0
+
+
+def provider_timeout(provider: str) -> float:
+    return PROVIDER_TIMEOUTS.get(provider, DEFAULT_TIMEOUT)
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the provider while its circuit breaker is open."""
+
+
+def is_retryable(exc: Exception, streamed: bool = True) -> bool:
+    """Rate limits, timeouts, dropped connections and 5xx answers are worth another try.
+
+    Timeouts of non-streamed calls are the exception (see COMPLETION_TIMEOUT).
+    """
+    if not streamed and isinstance(exc, (openai.APITimeoutError, httpx.TimeoutException, TimeoutError)):
+        return False
+    if isinstance(exc, (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError,
+                        openai.InternalServerError)):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code == 429 or exc.status_code >= 500
+    if isinstance(exc, (httpx.TimeoutException, httpx.TransportError, TimeoutError, ConnectionError)):
+        return True
+    code = getattr(exc, "code", None)  # google.genai.errors.APIError
+    return isinstance(code, int) and (code == 429 or code >= 500)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Closed -> open after `failures` consecutive errors; one trial call is let through after `reset_timeout`."""
+
+    def __init__(self, failures=BREAKER_FAILURES, reset_timeout=BREAKER_RESET):
+        self.failures = failures
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self._opened_at >= self.reset_timeout else "open"
+
+    def allow(self):
+        """Whether a call may go ahead; the one trial call of a half-open breaker gets "trial"."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_running:
+                return False
+            self._trial_running = True
+            return "trial"
+
+    def release_trial(self):
+        """The trial call ended without an outcome (its caller stopped early): let the next call try."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            self._consecutive = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive += 1
+            if self._trial_running or self._consecutive >= self.failures:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class LLMMetrics:
+    """Process-wide call counters and recent latencies per provider."""
+
+    def __init__(self, window=500):
+        self._lock = threading.Lock()
+        self._window = window
+        self._stats = {}
+
+    def _provider(self, provider):
+        return self._stats.setdefault(provider, {
+            "calls": 0, "errors": 0, "retries": 0, "rejected": 0, "hedged": 0, "hedge_won": 0,
+            "latency": deque(maxlen=self._window),
+            "first_token": deque(maxlen=self._window),
+        })
+
+    def record(self, provider, key, value=1):
+        with self._lock:
+            stats = self._provider(provider)
+            if key in ("latency", "first_token"):
+                stats[key].append(value)
+            else:
+                stats[key] += value
+
+    def snapshot(self):
+        def pct(values, q):
+            if not values:
+                return None
+            ordered = sorted(values)
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+        with self._lock:
+            rows = []
+            for provider, stats in sorted(self._stats.items()):
+                rows.append({
+                    "provider": provider,
+                    "state": breaker(provider).state,
+                    "calls": stats["calls"],
+                    "errors": stats["errors"],
+                    "retries": stats["retries"],
+                    "rejected": stats["rejected"],
+                    "hedged": stats["hedged"],
+                    "hedge won": stats["hedge_won"],
+                    "p50 s": pct(stats["latency"], 0.50),
+                    "p95 s": pct(stats["latency"], 0.95),
+                    "p99 s": pct(stats["latency"], 0.99),
+                    "first token p95 s": pct(stats["first_token"], 0.95),
+                })
+            return rows
+
+
+metrics = LLMMetrics()
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker(provider: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker()
+        return _breakers[provider]
+
+
+def _before_attempt(provider):
+    """Count the attempt, or raise CircuitOpenError; returns True for a half-open breaker's trial call."""
+    allowed = breaker(provider).allow()
+    if not allowed:
+        metrics.record(provider, "rejected")
+        raise CircuitOpenError(f"{provider} is temporarily unavailable after repeated failures, try again shortly")
+    metrics.record(provider, "calls")
+    return allowed == "trial"
+
+
+def _after_failure(provider, exc, attempt, max_attempts, streamed=True):
+    """Record a failed attempt; return the delay before the next one, or None to give up."""
+    metrics.record(provider, "errors")
+    if not is_retryable(exc):
+        # Bad request, auth error...: the provider itself is healthy
+        breaker(provider).record_success()
+        return None
+    breaker(provider).record_failure()
+    if not is_retryable(exc, streamed):
+        return None
+    if attempt + 1 >= max_attempts:
+        return None
+    metrics.record(provider, "retries")
+    return backoff_delay(attempt)
+
+
+def _retry_after(delay, cancel):
+    """Back off before the next attempt; False when `cancel` is set meanwhile (a hedge was already won)."""
+    if cancel is None:
+        time.sleep(delay)
+        return True
+    return not cancel.wait(delay)
+
+
+def call_llm(provider, fn, *args, max_attempts=MAX_ATTEMPTS, cancel=None, **kwargs):
+    """Run fn(*args, **kwargs) against `provider` with backoff retries and its circuit breaker.
+
+    Once the `cancel` event (if any) is set, a failed attempt is not retried.
+    """
+    for attempt in range(max_attempts):
+        trial = _before_attempt(provider)
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            delay = _after_failure(provider, e, attempt, max_attempts, streamed=False)
+            if delay is None or not _retry_after(delay, cancel):
+                raise
+            continue
+        except BaseException:
+            # Stopped early (GeneratorExit, CancelledError...): neither a success nor a failure
+            if trial:
+                breaker(provider).release_trial()
+            raise
+        metrics.record(provider, "latency", time.perf_counter() - start)
+        breaker(provider).record_success()
+        return result
+
+
+def stream_llm(provider, make_stream, *args, max_attempts=MAX_ATTEMPTS, cancel=None, **kwargs):
+    """Yield from make_stream(*args, **kwargs) with the same protection as call_llm.
+
+    A stream is only retried while it has produced no text; once text has been shown
+    an error is raised as is, since a restart would repeat it. Empty pieces (a reasoning
+    model thinking) are passed on but don't count as text.
+    """
+    for attempt in range(max_attempts):
+        trial = _before_attempt(provider)
+        start = time.perf_counter()
+        started = False
+        try:
+            for piece in make_stream(*args, **kwargs):
+                if piece and not started:
+                    started = True
+                    metrics.record(provider, "first_token", time.perf_counter() - start)
+                yield piece
+        except Exception as e:
+            delay = _after_failure(provider, e, attempt, attempt + 1 if started else max_attempts)
+            if delay is None or not _retry_after(delay, cancel):
+                raise
+            continue
+        except BaseException:
+            # Stopped early (GeneratorExit, CancelledError...): neither a success nor a failure
+            if trial:
+                breaker(provider).release_trial()
+            raise
+        metrics.record(provider, "latency", time.perf_counter() - start)
+        breaker(provider).record_success()
+        return
+
+
+async def acall_llm(provider, fn, *args, max_attempts=MAX_ATTEMPTS, **kwargs):
+    """call_llm for a coroutine function."""
+    for attempt in range(max_attempts):
+        trial = _before_attempt(provider)
+        start = time.perf_counter()
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception as e:
+            delay = _after_failure(provider, e, attempt, max_attempts, streamed=False)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            continue
+        except BaseException:
+            # Stopped early (GeneratorExit, CancelledError...): neither a success nor a failure
+            if trial:
+                breaker(provider).release_trial()
+            raise
+        metrics.record(provider, "latency", time.perf_counter() - start)
+        breaker(provider).record_success()
+        return result
+
+
+async def astream_llm(provider, make_stream, *args, max_attempts=MAX_ATTEMPTS, **kwargs):
+    """stream_llm for an async iterator factory."""
+    for attempt in range(max_attempts):
+        trial = _before_attempt(provider)
+        start = time.perf_counter()
+        started = False
+        try:
+            async for piece in make_stream(*args, **kwargs):
+                if piece and not started:
+                    started = True
+                    metrics.record(provider, "first_token", time.perf_counter() - start)
+                yield piece
+        except Exception as e:
+            delay = _after_failure(provider, e, attempt, attempt + 1 if started else max_attempts)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            continue
+        except BaseException:
+            # Stopped early (GeneratorExit, CancelledError...): neither a success nor a failure
+            if trial:
+                breaker(provider).release_trial()
+            raise
+        metrics.record(provider, "latency", time.perf_counter() - start)
+        breaker(provider).record_success()
+        return
+
+
+# --- Hedged requests ---
+# The primary provider gets `deadline` seconds to start answering; after that (or as soon
+# as it fails) the same request goes to the backup, and whichever answers first is used.
+# Each leg runs on its own daemon thread, so a stalled provider never holds up the other one.
+# Legs are one-argument callables taking a threading.Event that is set once the hedge is
+# decided; pass it on as `cancel=` to call_llm / stream_llm so the loser is not retried.
+
+
+def _pump(name, make_stream, out, cancel):
+    stream = make_stream(cancel)
+    try:
+        for piece in stream:
+            if cancel.is_set():
+                break
+            out.put((name, "data", piece))
+        out.put((name, "done", None))
+    except Exception as e:
+        out.put((name, "error", e))
+    finally:
+        stream.close()  # releases the HTTP response when this side lost the race
+
+
+def hedged_stream(primary, backup, deadline, metrics_key="hedge", outcome=None):
+    """Yield the answer of whichever of two stream factories shows life first.
+
+    Any piece counts, including the empty ones a reasoning model sends while thinking, so
+    a slow thinker that is making progress is not hedged away. The losing stream is
+    cancelled at its next chunk. Once a winner has started, its errors are raised like
+    any other mid-stream error. An `outcome` dict gets "winner": "primary" or "backup",
+    and "started": the legs that were called.
+    """
+    out = queue.Queue()
+    cancels = {}
+
+    def start(name, make_stream):
+        cancels[name] = threading.Event()
+        threading.Thread(target=_pump, args=(name, make_stream, out, cancels[name]), daemon=True).start()
+
+    start("primary", primary)
+    hedge_at = time.monotonic() + deadline
+    errors = {}
+    try:
+        while True:
+            try:
+                timeout = None if "backup" in cancels else max(0.0, hedge_at - time.monotonic())
+                name, kind, payload = out.get(timeout=timeout)
+            except queue.Empty:
+                metrics.record(metrics_key, "hedged")
+                start("backup", backup)
+                continue
+
+            if kind == "error":
+                errors[name] = payload
+                if "backup" not in cancels:
+                    # Primary failed before its deadline: fail over right away
+                    metrics.record(metrics_key, "hedged")
+                    start("backup", backup)
+                elif len(errors) == len(cancels):
+                    raise errors["primary"]
+                continue
+
+            winner = name
+            break
+
+        if winner == "backup":
+            metrics.record(metrics_key, "hedge_won")
+        if outcome is not None:
+            outcome["winner"] = winner
+            outcome["started"] = list(cancels)
+        for name, cancel in cancels.items():
+            if name != winner:
+                cancel.set()
+
+        while kind != "done":
+            if kind == "error":
+                raise payload
+            if payload:
+                yield payload
+            name, kind, payload = out.get()
+            while name != winner:
+                name, kind, payload = out.get()
+    finally:
+        for cancel in cancels.values():
+            cancel.set()
+
+
+def _run_leg(name, fn, out, cancel):
+    try:
+        out.put((name, None, fn(cancel)))
+    except Exception as e:
+        out.put((name, e, None))
+
+
+def hedged_call(primary, backup, deadline, metrics_key="hedge", outcome=None):
+    """Non-streaming hedge: the first of two calls to succeed wins.
+
+    A blocking SDK call can't be interrupted, so the loser's current attempt runs to
+    completion on its own thread and its result is dropped; it makes no further attempts.
+    An `outcome` dict gets "winner": "primary" or "backup".
+    """
+    out = queue.Queue()
+    cancel = threading.Event()
+    started = []
+
+    def start(name, fn):
+        started.append(name)
+        threading.Thread(target=_run_leg, args=(name, fn, out, cancel), daemon=True,
+                         name=f"llm-hedge-{name}").start()
+
+    start("primary", primary)
+    hedge_at = time.monotonic() + deadline
+    errors = {}
+    try:
+        while True:
+            try:
+                timeout = None if "backup" in started else max(0.0, hedge_at - time.monotonic())
+                name, error, result = out.get(timeout=timeout)
+            except queue.Empty:
+                metrics.record(metrics_key, "hedged")
+                start("backup", backup)
+                continue
+
+            if error is None:
+                if name == "backup":
+                    metrics.record(metrics_key, "hedge_won")
+                if outcome is not None:
+                    outcome["winner"] = name
+                return result
+            errors[name] = error
+            if "backup" not in started:
+                # Primary failed before its deadline: fail over right away
+                metrics.record(metrics_key, "hedged")
+                start("backup", backup)
+            elif len(errors) == len(started):
+                raise errors["primary"]
+    finally:
+        cancel.set()
@@ -0,0 +1,86 @@
+# utils/memory_pro.py
+from utils.token_pro import count_message_tokens
+
+SUMMARY_PROMPT = """You maintain the memory of a conversation between a user and an AI assistant.
+Update the summary below with the new exchanges. Keep facts, decisions, names, numbers,
+code identifiers and open questions; drop pleasantries. Answer with the updated summary
+only, at most 250 words.
+
+CURRENT SUMMARY:
+{summary}
+
+NEW EXCHANGES:
+{transcript}
+"""
+
+
+def summary_prompt(summary, messages):
+    transcript = "\n\n".join(f"{m['role'].upper()}: {m['content']}" for m in messages)
+    return SUMMARY_PROMPT.format(summary=summary or "(empty)", transcript=transcript)
+
+
+class ConversationMemory:
+    """Conversation memory with a bounded prompt size.
+
+    The newest turns are re-sent verbatim as long as they fit in `budget` tokens; older
+    turns are folded into a running summary by a background job, so no request waits
+    for summarization.
+    """
+
+    def __init__(self, budget=4000):
+        self.budget = budget
+        self.summary = ""
+        self.turns = []    # [(user message, assistant message)] not folded into the summary yet, oldest first
+        self._job = None   # (number of turns being summarized, Future)
+
+    def add_turn(self, user_content, assistant_content):
+        self.turns.append(({"role": "user", "content": user_content},
+                           {"role": "assistant", "content": assistant_content}))
+
+    def clear(self):
+        self.summary = ""
+        self.turns = []
+        self._job = None
+
+    def _collect(self):
+        """Apply a finished summary job; a failed one is simply retried later."""
+        if self._job is None or not self._job[1].done():
+            return
+        folded, future = self._job
+        self._job = None
+        if future.exception() is None and future.result() and not future.result().startswith("Error:"):
+            self.summary = future.result().strip()
+            self.turns = self.turns[folded:]
+
+    def _recent_count(self, backend):
+        used, count = 0, 0
+        for turn in reversed(self.turns):
+            used += count_message_tokens(turn, backend)
+            if used > self.budget:
+                break
+            count += 1
+        return count
+
+    def recent_messages(self, backend=None):
+        """The newest turns that fit in the budget, oldest first."""
+        self._collect()
+        count = self._recent_count(backend)
+        return [message for turn in self.turns[len(self.turns) - count:] for message in turn]
+
+    def maybe_summarize(self, backend, submit, summarize):
+        """Start folding the turns that no longer fit into the summary.
+
+        `submit(fn, *args)` schedules the job (e.g. an executor's submit) and
+        `summarize(prompt)` returns the new summary text.
+        """
+        self._collect()
+        if self._job is not None:
+            return
+        overflow = self.turns[:len(self.turns) - self._recent_count(backend)]
+        if overflow:
+            prompt = summary_prompt(self.summary, [message for turn in overflow for message in turn])
+            self._job = (len(overflow), submit(summarize, prompt))
+
+    @property
+    def summarizing(self):
+        return self._job is not None and not self._job[1].done()
@@ -5,15 +5,102 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 from PIL import Image
 import re
+import io
+import os
+import hashlib
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Documents with at least this many pages are extracted in a process pool
+PARALLEL_MIN_PAGES = 64
+# Pages per worker task; small enough to spread a document over every worker
+PAGES_PER_TASK = 32
+
+
+def _pdf_bytes(file):
+    if isinstance(file, (bytes, bytearray)):
+        return bytes(file)
+    if hasattr(file, "getvalue"):  # Streamlit UploadedFile, BytesIO
+        return file.getvalue()
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as f:
+            return f.read()
+    file.seek(0)
+    return file.read()
+
+
+# --- Extraction pool ---
+# One pool per process, started on first use and shared by every session. Workers are started
+# with forkserver (spawn where unavailable): forking the multi-threaded Streamlit server is unsafe.
+_pool = None
+_pool_lock = threading.Lock()
+
+# Worker side: the document being read, parsed once per worker rather than once per task
+_worker_reader = (None, None)
+
+
+def _extraction_pool(workers):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context("forkserver")
+                # Workers fork from a server that has imported this module already
+                context.set_forkserver_preload([__name__])
+            else:
+                context = multiprocessing.get_context("spawn")
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        return _pool
+
+
+def _extract_pages(path, start, stop):
+    """Worker: text of pages [start, stop) of the PDF at `path`."""
+    global _worker_reader
+    if _worker_reader[0] != path:
+        _worker_reader = (path, PyPDF2.PdfReader(path))
+    pages = _worker_reader[1].pages
+    return [pages[i].extract_text() for i in range(start, stop)]
+
+
+# Function to extract PDF text page by page
+def iter_pdf_pages(file, workers=None):
+    """Yield the text of each page in order.
+
+    Small documents are read serially; from PARALLEL_MIN_PAGES pages on, batches of
+    pages are extracted in parallel by the shared process pool (text extraction is
+    CPU-bound). The pool is sized by the first call (`workers`, default: CPU count).
+    Workers get the document through a temporary file, not a copy per task.
+    """
+    pdf_bytes = _pdf_bytes(file)
+    reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+    page_count = len(reader.pages)
+    workers = workers or os.cpu_count() or 1
+
+    if page_count < PARALLEL_MIN_PAGES or workers < 2:
+        for page in reader.pages:
+            yield page.extract_text()
+        return
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        f.write(pdf_bytes)
+    pool = _extraction_pool(workers)
+    futures = [pool.submit(_extract_pages, f.name, start, min(start + PAGES_PER_TASK, page_count))
+               for start in range(0, page_count, PAGES_PER_TASK)]
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        # A consumer that stops early drops the batches not started yet
+        for future in futures:
+            future.cancel()
+        os.unlink(f.name)
 
 
 # Function to read PDF and extract text
 def read_pdf(file):
-    pdf_reader = PyPDF2.PdfReader(file)
-    text = ""
-    for page in pdf_reader.pages:
-        text += page.extract_text() + "\n"
-    return text
+    return "".join(page + "\n" for page in iter_pdf_pages(file))
 
 # Function to chunk text
 def chunk_text(text, chunk_size=300):
@@ -26,6 +113,41 @@ def vectorize_text_chunks(text_chunks):
     tfidf_chunks = vectorizer.transform(text_chunks)
     return vectorizer, tfidf_chunks
 
+# --- Index cache ---
+# Bump when extraction, chunking or vectorizing changes, so older cached indexes are not reused
+PDF_INDEX_VERSION = 1
+
+
+def pdf_index_key(pdf_bytes, chunk_size=300):
+    """Cache key of a PDF's index: the content hash, so renamed or re-uploaded copies share it."""
+    return f"pdf-index:v{PDF_INDEX_VERSION}:{chunk_size}:{hashlib.sha256(pdf_bytes).hexdigest()}"
+
+
+def build_pdf_index(file, chunk_size=300):
+    text_chunks = chunk_text(read_pdf(file), chunk_size)
+    vectorizer, tfidf_chunks = vectorize_text_chunks(text_chunks)
+    return text_chunks, vectorizer, tfidf_chunks
+
+
+def load_pdf_index(file, store=None, chunk_size=300):
+    """(text_chunks, vectorizer, tfidf_chunks, from_cache) for a PDF.
+
+    With a `store` (e.g. a utils.cache_pro.DiskCache) the index is looked up by content
+    hash first and saved there after being built, so every session reuses it.
+    """
+    pdf_bytes = _pdf_bytes(file)
+    if store is None:
+        return (*build_pdf_index(pdf_bytes, chunk_size), False)
+    key = pdf_index_key(pdf_bytes, chunk_size)
+    index = store.get(key)
+    if index is not None:
+        return (*index, True)
+    index = build_pdf_index(pdf_bytes, chunk_size)
+    # The sparse matrix pickles as its three numpy arrays, so the entry stays compact
+    store.set(key, index)
+    return (*index, False)
+
+
 # Function to find the most similar chunks
 def find_most_similar_chunks(user_query, vectorizer, tfidf_chunks, text_chunks, top_n=4):
     tfidf_query = vectorizer.transform([user_query])
@@ -1812,7 +1812,10 @@
 #         st.code("\n".join(code_block_content), language=lang)
 
 
+import hashlib
 import re
+import threading
+from collections import OrderedDict
 import streamlit as st
 from pygments.lexers import guess_lexer
 from pygments.util import ClassNotFound
@@ -1825,6 +1828,20 @@ POSTGRES_SQL_KEYWORDS = {"SERIAL", "BIGSERIAL", "RETURNING", "ILIKE", "SIMILAR T
 
 SQL_COMMENT_RE = re.compile(r"(.*?)(--.*)$")
 
+
+def _keyword_alternation(keywords, whole_word=True):
+    # Longest first so e.g. BIGSERIAL wins over SERIAL at the same position
+    pattern = "|".join(re.escape(kw) for kw in sorted(keywords, key=len, reverse=True))
+    return re.compile(rf"\b(?:{pattern})\b" if whole_word else f"(?:{pattern})")
+
+
+# Matched against an upper-cased copy of the text: case-sensitive scans are several times
+# faster than re.IGNORECASE. PostgreSQL keywords are matched anywhere (no word boundaries).
+SQL_SELECT_RE = re.compile(r"\bSELECT\b")
+ORACLE_SQL_RE = _keyword_alternation(ORACLE_SQL_KEYWORDS)
+MYSQL_SQL_RE = _keyword_alternation(MYSQL_SQL_KEYWORDS)
+POSTGRES_SQL_RE = _keyword_alternation(POSTGRES_SQL_KEYWORDS, whole_word=False)
+
 PYTHON_START_RE = re.compile(
     r"""^\s*(def\s+\w+\s*\(|class\s+\w+|import\s+\w+|from\s+\w+|if\s+.+:|for\s+.+:|while\s+.+:|
      try:|except\s+.+:|with\s+.+:|\w+\s*=\s*.+)""",
@@ -1847,18 +1864,19 @@ LATEX_INLINE_DELIMITER_RE = re.compile(r'\\\(\s*([^\)]+?)\s*\\\)')
 # Regex to detect raw LaTeX code on a single line (frequently used commands)
 RAW_LATEX_RE = re.compile(r"\\(frac|sqrt|exp|sum|int|mu|sigma|left|right|alpha|beta|pi|text)")
 
+# Lines that would turn the previous line into a heading (setext) if joined to it
+SETEXT_UNDERLINE_RE = re.compile(r"^\s*(=+|-+)\s*$")
+
 
 def detect_sql_dialect(text: str) -> str | None:
-    if re.search(r"\bSELECT\b", text, re.IGNORECASE):
-        for kw in ORACLE_SQL_KEYWORDS:
-            if re.search(rf"\b{kw}\b", text, re.IGNORECASE):
-                return "oracle-sql"
-        for kw in MYSQL_SQL_KEYWORDS:
-            if re.search(rf"\b{kw}\b", text, re.IGNORECASE):
-                return "mysql"
-        for kw in POSTGRES_SQL_KEYWORDS:
-            if re.search(rf"{kw}", text, re.IGNORECASE):
-                return "postgresql"
+    upper = text.upper()
+    if SQL_SELECT_RE.search(upper):
+        if ORACLE_SQL_RE.search(upper):
+            return "oracle-sql"
+        if MYSQL_SQL_RE.search(upper):
+            return "mysql"
+        if POSTGRES_SQL_RE.search(upper):
+            return "postgresql"
         return "sql"
     return None
 
@@ -1876,10 +1894,27 @@ def looks_like_python_continuation(line: str) -> bool:
     )
 
 
-def guess_language(text: str) -> str | None:
-    dialect = detect_sql_dialect(text)
-    if dialect:
+# guess_lexer tries every registered lexer, so its answers are memoized by content hash
+LANGUAGE_CACHE_SIZE = 2048
+_language_cache = OrderedDict()
+_language_cache_lock = threading.Lock()
+
+
+def quick_guess_language(text: str) -> str | None:
+    """Cheap classification from the first non-empty line, tried before Pygments."""
+    first_line = next((line for line in text.splitlines() if line.strip()), "")
+    if first_line.strip().upper().startswith(SQL_START_KEYWORDS):
         return "sql"
+    if HTML_START_RE.match(first_line):
+        return "html"
+    if CSS_START_RE.match(first_line):
+        return "css"
+    if looks_like_python_start(first_line):
+        return "python"
+    return None
+
+
+def _guess_lexer_language(text: str) -> str | None:
     try:
         lexer = guess_lexer(text)
         return lexer.aliases[0] if lexer.aliases else None
@@ -1887,238 +1922,394 @@ def guess_language(text: str) -> str | None:
         return None
 
 
-def flush_buffer(buf, lang=None):
+def guess_language(text: str) -> str | None:
+    dialect = detect_sql_dialect(text)
+    if dialect:
+        return "sql"
+    quick = quick_guess_language(text)
+    if quick:
+        return quick
+
+    key = hashlib.sha1(text.encode("utf-8")).digest()
+    with _language_cache_lock:
+        if key in _language_cache:
+            _language_cache.move_to_end(key)
+            return _language_cache[key]
+
+    language = _guess_lexer_language(text)
+    with _language_cache_lock:
+        _language_cache[key] = language
+        if len(_language_cache) > LANGUAGE_CACHE_SIZE:
+            _language_cache.popitem(last=False)
+    return language
+
+
+def flush_buffer(buf, blocks, lang=None):
     if buf:
         lang_guess = lang or guess_language("\n".join(buf)) or ""
-        st.code("\n".join(buf), language=lang_guess)
+        blocks.append(("code", "\n".join(buf), lang_guess))
         buf.clear()
 
 
 # REMOVED: process_mixed_content is no longer needed.
 # We rely on st.markdown to handle the entire line including the inline $...$ math.
 
-def render_combined_markdown(text: str):
-    # --- FIX: Pre-process the text to convert \( ... \) to $...$ ---
-    # This standardizes all inline math notation for Streamlit's Markdown engine.
-    text = LATEX_INLINE_DELIMITER_RE.sub(r'$\1$', text)
+# Parsing and rendering are split: the parser turns lines into blocks
+#   ("markdown", text) | ("code", text, language) | ("latex", formula)
+# and render_blocks() sends them to Streamlit.
+
+class MarkdownBlockParser:
+    """Line-by-line state machine behind render_combined_markdown.
+
+    Lines may arrive over several calls (streaming). Finished blocks are appended to
+    `blocks`; code fences, math blocks and SQL/Python/HTML/CSS buffers stay open
+    between calls until a later line closes them.
+    """
+
+    def __init__(self):
+        self.blocks = []
 
-    lines = text.split("\n")
+        self.sql_buffer, self.py_buffer, self.html_buffer, self.css_buffer = [], [], [], []
+        self.in_sql = self.in_py = self.in_html = self.in_css = False
 
-    sql_buffer, py_buffer, html_buffer, css_buffer = [], [], [], []
-    in_sql = in_py = in_html = in_css = False
+        self.in_code_block = False
+        self.code_block_lang = ""
+        self.code_block_content = []
 
-    in_code_block = False
-    code_block_lang = ""
-    code_block_content = []
+        # Store the expected closing delimiter when inside a math block
+        self.math_closing_delimiter = ""
 
-    # Store the expected closing delimiter when inside a math block
-    math_closing_delimiter = ""
+    def _flush_unlabeled(self, *buffers):
+        for buf in buffers:
+            flush_buffer(buf, self.blocks)
 
-    i = 0
-    while i < len(lines):
-        line = lines[i]
+    def _flush_labeled(self):
+        flush_buffer(self.py_buffer, self.blocks, "python")
+        flush_buffer(self.sql_buffer, self.blocks, "sql")
+        flush_buffer(self.html_buffer, self.blocks, "html")
+        flush_buffer(self.css_buffer, self.blocks, "css")
+
+    # --- MATH RENDERING ---
+    # Helper to start a math block
+    def _start_math_block(self, formula_content, closing_delimiter=""):
+        self._flush_unlabeled(self.py_buffer, self.sql_buffer, self.html_buffer, self.css_buffer)
+
+        if closing_delimiter:
+            # Start multi-line collection
+            self.math_closing_delimiter = closing_delimiter
+            self.code_block_content.clear()
+            if formula_content:
+                self.code_block_content.append(formula_content)
+        else:
+            # Render single-line block immediately
+            if formula_content:
+                self.blocks.append(("latex", formula_content))
+
+    def feed_line(self, line: str):
         stripped = line.strip()
 
         # Check for closing math delimiter first
-        if math_closing_delimiter and stripped == math_closing_delimiter:
+        if self.math_closing_delimiter and stripped == self.math_closing_delimiter:
             # Render the collected math content
-            if code_block_content:
-                st.latex("\n".join(code_block_content))
-            code_block_content.clear()
-            math_closing_delimiter = ""  # Exit math block
-            i += 1
-            continue
+            if self.code_block_content:
+                self.blocks.append(("latex", "\n".join(self.code_block_content)))
+            self.code_block_content.clear()
+            self.math_closing_delimiter = ""  # Exit math block
+            return
 
         # If currently in a multi-line math block, append the line and continue
-        if math_closing_delimiter:
+        if self.math_closing_delimiter:
             if stripped:
-                code_block_content.append(line)
-            i += 1
-            continue
-
-        # --- MATH RENDERING ---
-        # Helper to start a math block
-        def start_math_block(formula_content, closing_delimiter=""):
-            nonlocal math_closing_delimiter
-            flush_buffer(py_buffer)
-            flush_buffer(sql_buffer)
-            flush_buffer(html_buffer)
-            flush_buffer(css_buffer)
-
-            if closing_delimiter:
-                # Start multi-line collection
-                math_closing_delimiter = closing_delimiter
-                code_block_content.clear()
-                if formula_content:
-                    code_block_content.append(formula_content)
-            else:
-                # Render single-line block immediately
-                if formula_content:
-                    st.latex(formula_content)
+                self.code_block_content.append(line)
+            return
 
         # 1. Display math: single line [ ... ] (Handles custom single line)
         if stripped.startswith("[") and stripped.endswith("]") and len(stripped) > 2:
-            formula = stripped[1:-1].strip()
-            start_math_block(formula)
-            i += 1
-            continue
+            self._start_math_block(stripped[1:-1].strip())
+            return
 
         # 2. Display math: inline $$...$$ (single line)
         if stripped.startswith("$$") and stripped.endswith("$$") and len(stripped) > 4:
-            formula = stripped[2:-2].strip()
-            start_math_block(formula)
-            i += 1
-            continue
+            self._start_math_block(stripped[2:-2].strip())
+            return
 
         # 3. Display math: multi-line $$ block
         if stripped == "$$":
-            start_math_block("", "$$")
-            i += 1
-            continue
+            self._start_math_block("", "$$")
+            return
 
         # 4. Display math: multi-line [ or \[ block (Handles custom and Markdown formats)
         if stripped in ("[", "\\["):
             closing_delimiter = "]" if stripped == "[" else "\\]"
-            start_math_block("", closing_delimiter)
-            i += 1
-            continue
+            self._start_math_block("", closing_delimiter)
+            return
 
         # 5. Raw LaTeX Line Detection (Handles standalone formulas without delimiters)
-        if stripped and RAW_LATEX_RE.search(stripped) and not in_code_block:
-            flush_buffer(py_buffer)
-            flush_buffer(sql_buffer)
-            flush_buffer(html_buffer)
-            flush_buffer(css_buffer)
-
-            # Use st.latex() directly on the line content
-            st.markdown(line)
-            i += 1
-            continue
+        if stripped and RAW_LATEX_RE.search(stripped) and not self.in_code_block:
+            self._flush_unlabeled(self.py_buffer, self.sql_buffer, self.html_buffer, self.css_buffer)
+            self.blocks.append(("markdown", line))
+            return
 
         # --- END MATH RENDERING ---
 
         # Code blocks
         if stripped.startswith("```"):
-            if not in_code_block:
-                in_code_block = True
-                code_block_lang = stripped[3:].strip()
-                code_block_content = []
+            if not self.in_code_block:
+                self.in_code_block = True
+                self.code_block_lang = stripped[3:].strip()
+                self.code_block_content = []
             else:
-                in_code_block = False
-                lang = code_block_lang or guess_language("\n".join(code_block_content)) or ""
-                st.code("\n".join(code_block_content), language=lang)
-            i += 1
-            continue
+                self.in_code_block = False
+                lang = self.code_block_lang or guess_language("\n".join(self.code_block_content)) or ""
+                self.blocks.append(("code", "\n".join(self.code_block_content), lang))
+                # Cleared so close() does not render the same block a second time
+                self.code_block_content = []
+            return
 
-        if in_code_block:
-            code_block_content.append(line)
-            i += 1
-            continue
+        if self.in_code_block:
+            self.code_block_content.append(line)
+            return
 
         # Python block detection
-        if not in_py and looks_like_python_start(line):
-            flush_buffer(sql_buffer)
-            flush_buffer(html_buffer)
-            flush_buffer(css_buffer)
-            in_py = True
-            py_buffer.append(line)
-            i += 1
-            continue
-        elif in_py:
+        if not self.in_py and looks_like_python_start(line):
+            self._flush_unlabeled(self.sql_buffer, self.html_buffer, self.css_buffer)
+            self.in_py = True
+            self.py_buffer.append(line)
+            return
+        elif self.in_py:
             if looks_like_python_continuation(line) or stripped == "":
-                py_buffer.append(line)
-                i += 1
-                continue
+                self.py_buffer.append(line)
+                return
             else:
-                flush_buffer(py_buffer, "python")
-                in_py = False
+                flush_buffer(self.py_buffer, self.blocks, "python")
+                self.in_py = False
 
         # SQL detection
-        if not in_sql and stripped.upper().startswith(SQL_START_KEYWORDS):
-            flush_buffer(py_buffer)
-            flush_buffer(html_buffer)
-            flush_buffer(css_buffer)
-            in_sql = True
-            sql_buffer.append(line)
-            i += 1
-            continue
-        elif in_sql:
-            sql_buffer.append(line)
-            i += 1
-            continue
+        if not self.in_sql and stripped.upper().startswith(SQL_START_KEYWORDS):
+            self._flush_unlabeled(self.py_buffer, self.html_buffer, self.css_buffer)
+            self.in_sql = True
+            self.sql_buffer.append(line)
+            return
+        elif self.in_sql:
+            self.sql_buffer.append(line)
+            return
 
         # HTML detection
-        if not in_html and HTML_START_RE.match(line):
-            flush_buffer(py_buffer)
-            flush_buffer(sql_buffer)
-            flush_buffer(css_buffer)
-            in_html = True
-            html_buffer.append(line)
-            i += 1
-            continue
-        elif in_html:
-            html_buffer.append(line)
+        if not self.in_html and HTML_START_RE.match(line):
+            self._flush_unlabeled(self.py_buffer, self.sql_buffer, self.css_buffer)
+            self.in_html = True
+            self.html_buffer.append(line)
+            return
+        elif self.in_html:
+            self.html_buffer.append(line)
             if stripped.lower().endswith("</html>") or stripped.lower().endswith("</body>"):
-                flush_buffer(html_buffer, "html")
-                in_html = False
-            i += 1
-            continue
+                flush_buffer(self.html_buffer, self.blocks, "html")
+                self.in_html = False
+            return
 
         # CSS detection
-        if not in_css and (CSS_START_RE.match(line) or CSS_PROP_RE.match(line)):
-            flush_buffer(py_buffer)
-            flush_buffer(sql_buffer)
-            flush_buffer(html_buffer)
-            in_css = True
-            css_buffer.append(line)
-            i += 1
-            continue
-        elif in_css:
-            css_buffer.append(line)
+        if not self.in_css and (CSS_START_RE.match(line) or CSS_PROP_RE.match(line)):
+            self._flush_unlabeled(self.py_buffer, self.sql_buffer, self.html_buffer)
+            self.in_css = True
+            self.css_buffer.append(line)
+            return
+        elif self.in_css:
+            self.css_buffer.append(line)
             if "}" in line:
-                flush_buffer(css_buffer, "css")
-                in_css = False
-            i += 1
-            continue
+                flush_buffer(self.css_buffer, self.blocks, "css")
+                self.in_css = False
+            return
+
+        # Inline math ($...$) or general text: flush any outstanding buffers as the content
+        # is changing mode, then render the WHOLE line as Markdown. After pre-conversion,
+        # Streamlit handles list/text formatting AND inline $...$ math correctly.
+        self._flush_labeled()
+        self.in_py = self.in_sql = self.in_html = self.in_css = False
+        self.blocks.append(("markdown", line))
+
+    def close(self):
+        # Flush any remaining buffers at the end
+        self._flush_labeled()
+        self.in_py = self.in_sql = self.in_html = self.in_css = False
+
+        # Final flush for any pending math block content (if the stream ended before the closing delimiter)
+        if self.code_block_content and self.math_closing_delimiter:
+            self.blocks.append(("latex", "\n".join(self.code_block_content)))
+        # Final flush for any pending code block content
+        elif self.code_block_content:
+            lang = self.code_block_lang or guess_language("\n".join(self.code_block_content)) or ""
+            self.blocks.append(("code", "\n".join(self.code_block_content), lang))
+
+        self.code_block_content = []
+        self.in_code_block = False
+        self.math_closing_delimiter = ""
+
+    def pending_blocks(self, partial_line=""):
+        """Preview of everything still open, plus an unfinished last line, without changing state."""
+        pending = []
+        for buf, lang in ((self.py_buffer, "python"), (self.sql_buffer, "sql"),
+                          (self.html_buffer, "html"), (self.css_buffer, "css")):
+            if buf:
+                pending.append(("code", "\n".join(buf), lang))
+
+        if self.math_closing_delimiter:
+            if self.code_block_content:
+                pending.append(("latex", "\n".join(self.code_block_content)))
+        elif self.in_code_block:
+            # No language guessing until the fence is closed
+            pending.append(("code", "\n".join(self.code_block_content), self.code_block_lang))
+
+        if partial_line:
+            if pending and pending[-1][0] == "code":
+                kind, content, lang = pending[-1]
+                pending[-1] = (kind, f"{content}\n{partial_line}" if content else partial_line, lang)
+            elif not self.math_closing_delimiter:
+                pending.append(("markdown", partial_line))
+        return pending
+
+
+def _join_markdown_lines(lines) -> str:
+    parts = [lines[0]]
+    for prev, line in zip(lines, lines[1:]):
+        # A hard break keeps every line on its own row, as when each line was its own element.
+        # Underlines and table starts get a paragraph break so they don't change the line above.
+        if SETEXT_UNDERLINE_RE.match(line) or (line.lstrip().startswith("|") and not prev.lstrip().startswith("|")):
+            parts.append("\n\n")
+        else:
+            parts.append("  \n")
+        parts.append(line)
+    return "".join(parts)
+
+
+def coalesce_markdown_blocks(blocks) -> list:
+    """Merge consecutive Markdown lines into one block per paragraph group (a blank line ends a group)."""
+    merged, group = [], []
+
+    def end_group():
+        if group:
+            merged.append(("markdown", _join_markdown_lines(group)))
+            group.clear()
+
+    for block in blocks:
+        if block[0] != "markdown":
+            end_group()
+            merged.append(block)
+        elif block[1].strip():
+            group.append(block[1])
+        else:
+            end_group()
+    end_group()
+    return merged
 
-        # Inline math handling or general text
-        if INLINE_MATH_RE.search(line):
 
-            # Flush existing buffers as the content is changing mode
-            flush_buffer(py_buffer, "python")
-            flush_buffer(sql_buffer, "sql")
-            flush_buffer(html_buffer, "html")
-            flush_buffer(css_buffer, "css")
-            in_py = in_sql = in_html = in_css = False
+def parse_markdown_blocks(text: str, coalesce: bool = True) -> list:
+    # --- FIX: Pre-process the text to convert \( ... \) to $...$ ---
+    # This standardizes all inline math notation for Streamlit's Markdown engine.
+    text = LATEX_INLINE_DELIMITER_RE.sub(r'$\1$', text)
 
-            # FIX: Render the WHOLE line as Markdown. After pre-conversion,
-            # Streamlit handles list/text formatting AND inline $...$ math correctly.
-            st.markdown(line)
+    parser = MarkdownBlockParser()
+    for line in text.split("\n"):
+        parser.feed_line(line)
+    parser.close()
+    return coalesce_markdown_blocks(parser.blocks) if coalesce else parser.blocks
+
+
+def render_blocks(blocks):
+    for block in blocks:
+        if block[0] == "code":
+            st.code(block[1], language=block[2])
+        elif block[0] == "latex":
+            st.latex(block[1])
+        else:
+            st.markdown(block[1])
 
+
+def render_combined_markdown(text: str):
+    render_blocks(parse_markdown_blocks(text))
+
+
+# Block lists are keyed by a content hash; the leading underscore keeps Streamlit
+# from hashing the (possibly very long) text itself.
+@st.cache_data(max_entries=2000, show_spinner=False)
+def _cached_markdown_blocks(content_hash: str, _text: str) -> list:
+    return parse_markdown_blocks(_text)
+
+
+def render_cached_markdown(text: str):
+    """render_combined_markdown for content that does not change between reruns (chat history).
+
+    Each distinct text is parsed (and its code languages guessed) once per process;
+    later reruns only replay the cached block list.
+    """
+    content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    render_blocks(_cached_markdown_blocks(content_hash, text))
+
+
+class StreamingMarkdownRenderer:
+    """Incremental counterpart of render_combined_markdown for text that arrives in chunks.
+
+    Each complete line goes through the parser once. Finished blocks are written once
+    and never touched again; only the trailing unfinished block (an open buffer or the
+    current paragraph group) is redrawn per chunk.
+    """
+
+    def __init__(self, container=None):
+        self._root = container if container is not None else st.container()
+        self._parser = MarkdownBlockParser()
+        self._partial = ""
+        self._written = 0  # number of parser blocks already sent to Streamlit
+        self._tail = self._root.empty()
+
+    def feed(self, chunk: str):
+        if "\n" in chunk:
+            *lines, self._partial = (self._partial + chunk).split("\n")
+            for line in lines:
+                # \( ... \) is converted per line here, so it must not span lines while streaming
+                self._parser.feed_line(LATEX_INLINE_DELIMITER_RE.sub(r'$\1$', line))
+            self._write_finished()
+        else:
+            self._partial += chunk
+        self._draw_tail()
+
+    def close(self):
+        if self._partial:
+            self._parser.feed_line(LATEX_INLINE_DELIMITER_RE.sub(r'$\1$', self._partial))
+            self._partial = ""
+        self._parser.close()
+        self._write_finished(final=True)
+        self._tail.empty()
+
+    def _write_finished(self, final=False):
+        blocks = self._parser.blocks
+        end = len(blocks)
+        if not final:
+            # The last paragraph group stays open until a blank line or another block ends it
+            while end > self._written and blocks[end - 1][0] == "markdown" and blocks[end - 1][1].strip():
+                end -= 1
+        finished = blocks[self._written:end]
+        if finished:
+            # Finished blocks take over the tail slot; a fresh slot is opened after them
+            with self._tail.container():
+                render_blocks(coalesce_markdown_blocks(finished))
+            self._written = end
+            self._tail = self._root.empty()
+
+    def _draw_tail(self):
+        pending = self._parser.blocks[self._written:] + self._parser.pending_blocks(self._partial)
+        if pending:
+            with self._tail.container():
+                render_blocks(coalesce_markdown_blocks(pending))
         else:
-            # If line is not in a block/buffer and doesn't have inline math,
-            # flush any outstanding buffers and then render the line as standard Markdown.
-
-            flush_buffer(py_buffer, "python")
-            flush_buffer(sql_buffer, "sql")
-            flush_buffer(html_buffer, "html")
-            flush_buffer(css_buffer, "css")
-            in_py = in_sql = in_html = in_css = False
-
-            st.markdown(line)
-
-        i += 1
-
-    # Flush any remaining buffers at the end
-    flush_buffer(py_buffer, "python")
-    flush_buffer(sql_buffer, "sql")
-    flush_buffer(html_buffer, "html")
-    flush_buffer(css_buffer, "css")
-
-    # Final flush for any pending math block content (if the stream ended before the closing delimiter)
-    if code_block_content and math_closing_delimiter:
-        st.latex("\n".join(code_block_content))
-    # Final flush for any pending code block content
-    elif code_block_content:
-        lang = code_block_lang or guess_language("\n".join(code_block_content)) or ""
-        st.code("\n".join(code_block_content), language=lang)
\ No newline at end of file
+            self._tail.empty()
+
+
+def render_markdown_stream(chunks, container=None) -> str:
+    """Render streamed text chunks as they arrive and return the full text."""
+    renderer = StreamingMarkdownRenderer(container)
+    parts = []
+    for chunk in chunks:
+        if chunk:
+            parts.append(chunk)
+            renderer.feed(chunk)
+    renderer.close()
+    return "".join(parts)
@@ -0,0 +1,308 @@
+# utils/provider_pro.py
+import asyncio
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from utils.client_pro import (
+    get_openai_client, get_deepseek_client, get_gemini_client,
+    get_async_openai_client, get_async_deepseek_client,
+)
+from utils.llm_pro import astream_llm, COMPLETION_TIMEOUT
+
+# One adapter per selectable provider name. Each converts OpenAI-style messages
+# ({"role", "content"} dicts) to its API and exposes the same four calls:
+#   complete(messages, usage=None) -> str        stream(messages, usage=None) -> iterator of str
+#   acomplete(messages, usage=None) -> str       astream(messages, usage=None) -> async iterator of str
+# When a `usage` dict is passed it is filled with input_tokens, output_tokens,
+# cached_tokens and total_tokens once the provider reports them.
+# Streams may also yield "" while a reasoning model is thinking: a sign of life for
+# hedging deadlines that consumers skip when displaying the text.
+
+SYNC_CLIENTS = {"openai": get_openai_client, "deepseek": get_deepseek_client}
+ASYNC_CLIENTS = {"openai": get_async_openai_client, "deepseek": get_async_deepseek_client}
+
+
+def _fill_usage(usage, input_tokens=0, output_tokens=0, cached_tokens=0, total_tokens=None):
+    if usage is None:
+        return
+    input_tokens, output_tokens, cached_tokens = input_tokens or 0, output_tokens or 0, cached_tokens or 0
+    usage.update({
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "cached_tokens": cached_tokens,
+        "total_tokens": total_tokens or input_tokens + output_tokens,
+    })
+
+
+def _openai_usage(usage, reported):
+    """Chat Completions and Responses usage objects (DeepSeek reports cache hits separately)."""
+    if reported is None:
+        return
+    details = getattr(reported, "prompt_tokens_details", None) or getattr(reported, "input_tokens_details", None)
+    cached = getattr(details, "cached_tokens", 0) if details else getattr(reported, "prompt_cache_hit_tokens", 0)
+    _fill_usage(
+        usage,
+        input_tokens=getattr(reported, "prompt_tokens", None) or getattr(reported, "input_tokens", 0),
+        output_tokens=getattr(reported, "completion_tokens", None) or getattr(reported, "output_tokens", 0),
+        cached_tokens=cached,
+        total_tokens=getattr(reported, "total_tokens", None),
+    )
+
+
+class ProviderAdapter(ABC):
+    def __init__(self, name, backend, model):
+        self.name = name
+        self.backend = backend  # shares timeouts, retries and circuit breaker with other models of the same API
+        self.model = model
+
+    @abstractmethod
+    def complete(self, messages, usage=None):
+        ...
+
+    @abstractmethod
+    def stream(self, messages, usage=None):
+        ...
+
+    @abstractmethod
+    async def acomplete(self, messages, usage=None):
+        ...
+
+    @abstractmethod
+    def astream(self, messages, usage=None):
+        """Implemented as an async generator."""
+
+
+class OpenAIChatAdapter(ProviderAdapter):
+    """Chat Completions API: OpenAI chat models and DeepSeek."""
+
+    def complete(self, messages, usage=None):
+        response = SYNC_CLIENTS[self.backend]().chat.completions.create(
+            model=self.model, messages=messages, timeout=COMPLETION_TIMEOUT
+        )
+        _openai_usage(usage, response.usage)
+        return response.choices[0].message.content.strip()
+
+    def stream(self, messages, usage=None):
+        # deepseek-reasoner also streams `reasoning_content`; only the answer is shown.
+        with SYNC_CLIENTS[self.backend]().chat.completions.create(
+            model=self.model, messages=messages, stream=True, stream_options={"include_usage": True}
+        ) as stream:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+                elif chunk.choices and getattr(chunk.choices[0].delta, "reasoning_content", None):
+                    yield ""
+                elif getattr(chunk, "usage", None):
+                    _openai_usage(usage, chunk.usage)
+
+    async def acomplete(self, messages, usage=None):
+        response = await ASYNC_CLIENTS[self.backend]().chat.completions.create(
+            model=self.model, messages=messages, timeout=COMPLETION_TIMEOUT
+        )
+        _openai_usage(usage, response.usage)
+        return response.choices[0].message.content.strip()
+
+    async def astream(self, messages, usage=None):
+        stream = await ASYNC_CLIENTS[self.backend]().chat.completions.create(
+            model=self.model, messages=messages, stream=True, stream_options={"include_usage": True}
+        )
+        async with stream:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+                elif chunk.choices and getattr(chunk.choices[0].delta, "reasoning_content", None):
+                    yield ""
+                elif getattr(chunk, "usage", None):
+                    _openai_usage(usage, chunk.usage)
+
+
+class OpenAIResponsesAdapter(ProviderAdapter):
+    """Responses API (GPT-5.2)."""
+
+    def complete(self, messages, usage=None):
+        response = SYNC_CLIENTS[self.backend]().responses.create(
+            model=self.model, input=messages, timeout=COMPLETION_TIMEOUT
+        )
+        _openai_usage(usage, response.usage)
+        return response.output_text.strip()
+
+    def stream(self, messages, usage=None):
+        with SYNC_CLIENTS[self.backend]().responses.create(model=self.model, input=messages, stream=True) as stream:
+            for event in stream:
+                if event.type == "response.output_text.delta":
+                    yield event.delta
+                elif event.type == "response.completed":
+                    _openai_usage(usage, event.response.usage)
+
+    async def acomplete(self, messages, usage=None):
+        response = await ASYNC_CLIENTS[self.backend]().responses.create(
+            model=self.model, input=messages, timeout=COMPLETION_TIMEOUT
+        )
+        _openai_usage(usage, response.usage)
+        return response.output_text.strip()
+
+    async def astream(self, messages, usage=None):
+        stream = await ASYNC_CLIENTS[self.backend]().responses.create(model=self.model, input=messages, stream=True)
+        async with stream:
+            async for event in stream:
+                if event.type == "response.output_text.delta":
+                    yield event.delta
+                elif event.type == "response.completed":
+                    _openai_usage(usage, event.response.usage)
+
+
+def to_gemini_request(messages):
+    """Split OpenAI-style messages into Gemini contents and a generation config."""
+    gemini_system_instruction = ""
+    gemini_contents = []
+    for message in messages:
+        if message["role"] == "system":
+            gemini_system_instruction = message["content"]
+        elif message["role"] == "user":
+            gemini_contents.append({"role": "user", "parts": [{"text": message["content"]}]})
+        elif message["role"] == "assistant":
+            gemini_contents.append({"role": "model", "parts": [{"text": message["content"]}]})
+
+    config = {}
+    if gemini_system_instruction:
+        config["system_instruction"] = gemini_system_instruction
+    return gemini_contents, config
+
+
+def _gemini_usage(usage, metadata):
+    if metadata is None:
+        return
+    _fill_usage(
+        usage,
+        input_tokens=metadata.prompt_token_count,
+        # Thinking tokens are billed as output
+        output_tokens=(metadata.candidates_token_count or 0) + (metadata.thoughts_token_count or 0),
+        cached_tokens=metadata.cached_content_token_count,
+        total_tokens=metadata.total_token_count,
+    )
+
+
+def _completion_config(config):
+    # HttpOptions.timeout is in milliseconds
+    return {**config, "http_options": {"timeout": COMPLETION_TIMEOUT * 1000}}
+
+
+class GeminiAdapter(ProviderAdapter):
+    def complete(self, messages, usage=None):
+        gemini_contents, config = to_gemini_request(messages)
+        config = _completion_config(config)
+        response = get_gemini_client().models.generate_content(model=self.model, contents=gemini_contents, config=config)
+        _gemini_usage(usage, response.usage_metadata)
+        return response.text
+
+    def stream(self, messages, usage=None):
+        gemini_contents, config = to_gemini_request(messages)
+        for chunk in get_gemini_client().models.generate_content_stream(
+            model=self.model, contents=gemini_contents, config=config
+        ):
+            if chunk.text:
+                yield chunk.text
+            # Every chunk carries the running totals; the last one is final
+            _gemini_usage(usage, chunk.usage_metadata)
+
+    async def acomplete(self, messages, usage=None):
+        gemini_contents, config = to_gemini_request(messages)
+        config = _completion_config(config)
+        response = await get_gemini_client().aio.models.generate_content(
+            model=self.model, contents=gemini_contents, config=config
+        )
+        _gemini_usage(usage, response.usage_metadata)
+        return response.text
+
+    async def astream(self, messages, usage=None):
+        gemini_contents, config = to_gemini_request(messages)
+        async for chunk in await get_gemini_client().aio.models.generate_content_stream(
+            model=self.model, contents=gemini_contents, config=config
+        ):
+            if chunk.text:
+                yield chunk.text
+            _gemini_usage(usage, chunk.usage_metadata)
+
+
+# --- Registry ---
+PROVIDERS = {}
+
+
+def register_provider(adapter):
+    PROVIDERS[adapter.name] = adapter
+    return adapter
+
+
+def get_provider(name) -> ProviderAdapter:
+    return PROVIDERS[name]
+
+
+register_provider(OpenAIResponsesAdapter("GPT-5.2", "openai", "gpt-5.2"))
+register_provider(OpenAIChatAdapter("GPT-5.2-chat", "openai", "gpt-5.2-chat-latest"))
+register_provider(OpenAIChatAdapter("GPT-5-mini", "openai", "gpt-5-mini"))
+register_provider(OpenAIChatAdapter("deepseek-chat", "deepseek", "deepseek-chat"))
+register_provider(OpenAIChatAdapter("deepseek-reasoner", "deepseek", "deepseek-reasoner"))
+register_provider(GeminiAdapter("Gemini-3", "gemini", "gemini-3-pro-preview"))
+
+
+# --- Event loop for the async calls ---
+# Async clients keep their connection pools bound to one loop, so every coroutine runs on
+# this single background loop; Streamlit's script thread only waits on the returned future.
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def event_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-async-loop", daemon=True).start()
+        return _loop
+
+
+def run_async(coro):
+    """Schedule a coroutine on the shared loop; returns a concurrent.futures.Future."""
+    return asyncio.run_coroutine_threadsafe(coro, event_loop())
+
+
+def stream_concurrently(adapters, messages):
+    """Stream the same messages from several providers at once.
+
+    Yields (index, "data", text) as pieces arrive from any provider, and (index, "done", stats)
+    when one finishes, with stats = {"latency", "first_token", "usage", "error"} (seconds, tokens).
+    Closing the generator early cancels the streams that are still running.
+    """
+    events = queue.Queue()
+
+    async def run_one(index, adapter):
+        stats = {"latency": None, "first_token": None, "usage": {}, "error": None}
+        start = time.perf_counter()
+        try:
+            async for piece in astream_llm(adapter.backend, adapter.astream, messages, usage=stats["usage"]):
+                if not piece:
+                    continue
+                if stats["first_token"] is None:
+                    stats["first_token"] = time.perf_counter() - start
+                events.put((index, "data", piece))
+        except Exception as e:
+            stats["error"] = str(e)
+            events.put((index, "data", f"Error: {e}"))
+        stats["latency"] = time.perf_counter() - start
+        events.put((index, "done", stats))
+
+    async def run_all():
+        await asyncio.gather(*(run_one(i, adapter) for i, adapter in enumerate(adapters)))
+
+    future = run_async(run_all())
+    remaining = len(adapters)
+    try:
+        while remaining:
+            event = events.get()
+            if event[1] == "done":
+                remaining -= 1
+            yield event
+    finally:
+        future.cancel()
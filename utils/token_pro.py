@@ -0,0 +1,126 @@
+# utils/token_pro.py
+import math
+import re
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:  # listed in requirements.txt; without it every count is an estimate
+    tiktoken = None
+
+# Exact local tokenizer per backend (OpenAI models, via tiktoken). DeepSeek and Gemini publish
+# no local tokenizer, so their counts always use the estimate below.
+BACKEND_ENCODINGS = {"openai": "o200k_base"}
+
+# Chat formatting adds a few tokens around every message
+MESSAGE_OVERHEAD = 4
+
+# Chinese, Japanese and Korean characters are roughly one token each
+CJK_RE = re.compile("[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]")
+
+
+def estimate_text_tokens(text: str) -> int:
+    """Fast tokenizer-free estimate: ~4 characters per token, one per CJK character."""
+    if not text:
+        return 0
+    if text.isascii():
+        return math.ceil(len(text) / 4)
+    cjk = len(text) - len(CJK_RE.sub("", text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+@lru_cache(maxsize=4)
+def _encoding(name):
+    """The tiktoken encoding, or None. tiktoken downloads it on first use, so a host without
+    internet access (and no TIKTOKEN_CACHE_DIR) falls back to the estimate instead of failing."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=512)
+def _count(text, encoding_name):
+    encoding = _encoding(encoding_name) if encoding_name else None
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return estimate_text_tokens(text)
+
+
+def count_tokens(text: str, backend: str = None) -> int:
+    """Tokens in `text` for a backend ("openai", "deepseek", "gemini"); exact where a local tokenizer exists."""
+    if not text:
+        return 0
+    return _count(text, BACKEND_ENCODINGS.get(backend))
+
+
+def count_message_tokens(messages, backend: str = None) -> int:
+    return sum(count_tokens(m["content"], backend) + MESSAGE_OVERHEAD for m in messages)
+
+
+# --- Pricing ---
+# USD per 1M tokens: (input, cached input, output). List prices when this was written;
+# override or extend with a `pricing` table in secrets, e.g. pricing = { "gpt-5.2" = [1.75, 0.175, 14.0] }
+MODEL_PRICES = {
+    "gpt-5.2": (1.75, 0.175, 14.0),
+    "gpt-5.2-chat-latest": (1.75, 0.175, 14.0),
+    "gpt-5-mini": (0.25, 0.025, 2.0),
+    "deepseek-chat": (0.28, 0.028, 0.42),
+    "deepseek-reasoner": (0.28, 0.028, 0.42),
+    "gemini-3-pro-preview": (2.0, 0.2, 12.0),
+}
+
+
+def usage_cost(model, usage, prices=None):
+    """Dollar cost of one call from its usage dict, or None when the model has no price."""
+    price = (prices or MODEL_PRICES).get(model)
+    if not price or not usage:
+        return None
+    input_price, cached_price, output_price = price
+    cached = usage.get("cached_tokens", 0)
+    uncached = max(usage.get("input_tokens", 0) - cached, 0)
+    return (uncached * input_price + cached * cached_price + usage.get("output_tokens", 0) * output_price) / 1_000_000
+
+
+# --- Context windows ---
+# Input tokens each model accepts; OUTPUT_RESERVE is kept free for the answer
+CONTEXT_LIMITS = {
+    "gpt-5.2": 272_000,
+    "gpt-5.2-chat-latest": 128_000,
+    "gpt-5-mini": 272_000,
+    "deepseek-chat": 128_000,
+    "deepseek-reasoner": 128_000,
+    "gemini-3-pro-preview": 1_048_576,
+}
+DEFAULT_CONTEXT_LIMIT = 128_000
+OUTPUT_RESERVE = 8_000
+
+
+def context_limit(model: str) -> int:
+    """Tokens available for the prompt of `model`."""
+    return CONTEXT_LIMITS.get(model, DEFAULT_CONTEXT_LIMIT) - OUTPUT_RESERVE
+
+
+def trim_context_to_budget(context: str, question: str, max_tokens: int, backend: str = None) -> str:
+    """Keep the chunks of `context` most relevant to `question` that fit in `max_tokens`, in document order."""
+    from utils.pdf_pro import chunk_text, vectorize_text_chunks, find_most_similar_chunks
+
+    if max_tokens <= 0:
+        return ""
+    chunks = chunk_text(context)
+    if len(chunks) <= 1:
+        # A single huge "chunk" (e.g. no spaces): fall back to a plain cut
+        return context[:max_tokens * 4]
+    vectorizer, tfidf_chunks = vectorize_text_chunks(chunks)
+    ranked = find_most_similar_chunks(question, vectorizer, tfidf_chunks, list(range(len(chunks))), top_n=len(chunks))
+
+    keep, used = [], 0
+    for index in ranked:
+        tokens = count_tokens(chunks[index], backend) + 2  # + separator
+        if used + tokens > max_tokens:
+            continue
+        keep.append(index)
+        used += tokens
+    return "\n\n".join(chunks[i] for i in sorted(keep))